@@ -0,0 +1,201 @@
+"""
+Архівація старих рядків робочого аркуша.
+
+Рядки з датою (колонка A), старшою за ARCHIVE.max_age_days, переносяться
+у вкладки за місяць або рік ("Архів 2025-06" / "Архів 2025") — у тій самій
+таблиці або в окремій (ARCHIVE.spreadsheet_url) — і видаляються з робочого
+аркуша. Куди потрапив кожен запис, реєстр зберігає в таблиці sheet_archive,
+тож синхронізація оновлює старі транзакції прямо у вкладці архіву.
+
+    python archive.py
+    python archive.py --max-age-days 365 --dry-run
+"""
+import argparse
+from datetime import datetime, timedelta
+import gspread
+from config_manager import config_manager
+from ledger import get_ledger
+from retry import sheets_read, sheets_write
+from sheet_index import FIRST_DATA_ROW, ID_COLUMN, ROW_WIDTH, HASH_COLUMN, column_letter, normalize_cell, parse_hash_cell, forget_index
+from sheet_writer import SheetWriter, BATCH_MAX_RANGES
+from sheets_client import get_spreadsheet, get_worksheet, sheet_settings
+from table import init_google_sheet
+
+ARCHIVE_SECTION = "ARCHIVE"
+DEFAULT_MAX_AGE_DAYS = 180
+DEFAULT_PERIOD = "month"
+# Більше рядків за один запуск не переносимо — решта піде наступного разу
+DEFAULT_MAX_ROWS_PER_RUN = 20000
+
+TAB_TITLES = {"month": "Архів %Y-%m", "year": "Архів %Y"}
+ARCHIVE_TAB_ROWS = 1000
+DATE_FORMAT = {"numberFormat": {"type": "DATE_TIME", "pattern": "dd.mm.yyyy hh:mm"}}
+SHEETS_EPOCH = datetime(1899, 12, 30)
+
+
+def archive_settings() -> dict:
+    conf = config_manager().get(ARCHIVE_SECTION, {})
+    period = conf.get("period", DEFAULT_PERIOD)
+    if period not in TAB_TITLES:
+        raise ValueError(f"ARCHIVE.period має бути одним з {', '.join(TAB_TITLES)}, а не {period!r}")
+    return {
+        "max_age_days": conf.get("max_age_days", DEFAULT_MAX_AGE_DAYS),
+        "period": period,
+        "spreadsheet_url": conf.get("spreadsheet_url") or sheet_settings()["spreadsheet_url"],
+        "max_rows_per_run": conf.get("max_rows_per_run", DEFAULT_MAX_ROWS_PER_RUN),
+    }
+
+
+def tab_title(serial: float, period: str) -> str:
+    return (SHEETS_EPOCH + timedelta(days=serial)).strftime(TAB_TITLES[period])
+
+
+def row_runs(row_numbers):
+    """[2, 3, 4, 9, 10] -> [(2, 4), (9, 10)]."""
+    runs = []
+    for row_number in sorted(row_numbers):
+        if runs and runs[-1][1] == row_number - 1:
+            runs[-1] = (runs[-1][0], row_number)
+        else:
+            runs.append((row_number, row_number))
+    return runs
+
+
+def find_old_rows(worksheet, cutoff_serial: float, limit: int):
+    """[(номер рядка, дата)] рядків з датою раніше cutoff_serial; читається лише колонка A."""
+    [dates] = sheets_read(worksheet.batch_get, [f"A{FIRST_DATA_ROW}:A"], value_render_option="UNFORMATTED_VALUE")
+    old = []
+    for offset, row in enumerate(dates):
+        value = row[0] if row else ""
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value < cutoff_serial:
+            old.append((FIRST_DATA_ROW + offset, value))
+            if len(old) >= limit:
+                break
+    return old
+
+
+def read_rows(worksheet, runs) -> dict:
+    """{номер рядка: рядок A:Z} для діапазонів рядків runs."""
+    last_col = column_letter(HASH_COLUMN)
+    rows = {}
+    for offset in range(0, len(runs), BATCH_MAX_RANGES):
+        chunk = runs[offset:offset + BATCH_MAX_RANGES]
+        ranges = [f"A{start}:{last_col}{end}" for start, end in chunk]
+        values = sheets_read(worksheet.batch_get, ranges, value_render_option="UNFORMATTED_VALUE")
+        for (start, end), run_values in zip(chunk, values):
+            for i in range(end - start + 1):
+                rows[start + i] = list(run_values[i]) if i < len(run_values) else []
+    return rows
+
+
+def delete_rows(worksheet, runs):
+    """
+    Видаляє діапазони рядків знизу вгору, щоб номери ще не видалених не зсувались.
+    Саме через worksheet.delete_rows: він зменшує row_count закешованого аркуша,
+    інакше SheetWriter вважатиме, що місця ще вистачає, і писатиме за межі сітки.
+    """
+    for start, end in sorted(runs, reverse=True):
+        sheets_write(worksheet.delete_rows, start, end)
+
+
+def archive_worksheet(url: str, title: str, header):
+    """Вкладка архіву; якщо її ще немає — створює із заголовком робочого аркуша."""
+    try:
+        return get_worksheet(name=title, url=url)
+    except gspread.WorksheetNotFound:
+        pass
+    spreadsheet = get_spreadsheet(url)
+    width = HASH_COLUMN + 1
+    worksheet = sheets_write(spreadsheet.add_worksheet, title=title, rows=ARCHIVE_TAB_ROWS, cols=width)
+    sheets_write(worksheet.update, f"A1:{column_letter(HASH_COLUMN)}1", [header[:width] + [""] * (width - len(header))])
+    sheets_write(worksheet.format, f"A{FIRST_DATA_ROW}:A", DATE_FORMAT)
+    print(f"🗂️ Створено вкладку архіву '{title}'.")
+    return get_worksheet(name=title, url=url)
+
+
+def run_archive(max_age_days=None, dry_run=False):
+    """Переносить рядки, старші за max_age_days, з робочого аркуша у вкладки архіву."""
+    settings = archive_settings()
+    max_age_days = max_age_days or settings["max_age_days"]
+    period = settings["period"]
+    url = settings["spreadsheet_url"]
+
+    live = init_google_sheet()
+    cutoff = (datetime.now() - timedelta(days=max_age_days) - SHEETS_EPOCH).total_seconds() / 86400
+    old = find_old_rows(live, cutoff, settings["max_rows_per_run"])
+    if not old:
+        print(f"✅ Рядків, старших за {max_age_days} днів, немає.")
+        return
+
+    runs = row_runs(row_number for row_number, serial in old)
+    rows = read_rows(live, runs)
+    by_tab = {}
+    for row_number, serial in old:
+        by_tab.setdefault(tab_title(serial, period), []).append(rows[row_number])
+
+    if dry_run:
+        for title, tab_rows in by_tab.items():
+            print(f"🗂️ {title}: {len(tab_rows)} рядків.")
+        return
+
+    header = sheets_read(live.row_values, 1)
+    ledger = get_ledger()
+    for title, tab_rows in by_tab.items():
+        writer = SheetWriter(archive_worksheet(url, title, header))
+        # Рядки, які перерваний запуск уже скопіював, але не встиг видалити, вдруге не додаємо
+        fresh = [
+            row[:ROW_WIDTH] + [""] * (ROW_WIDTH - len(row))
+            for row in tab_rows
+            if not (len(row) > ID_COLUMN and normalize_cell(row[ID_COLUMN]) in writer.index)
+        ]
+        if fresh:
+            writer.append(fresh, value_input_option="RAW")
+
+        locations = []
+        for row in tab_rows:
+            tx_id = normalize_cell(row[ID_COLUMN]) if len(row) > ID_COLUMN else ""
+            if tx_id:
+                row_number, row_hash = writer.index.get(tx_id)
+                # Відбиток з колонки Z — це хеш рядка реєстру, з ним і порівнює синхронізація
+                live_hash = parse_hash_cell(row[HASH_COLUMN]) if len(row) > HASH_COLUMN else ""
+                locations.append((tx_id, url, title, row_number, live_hash or row_hash))
+        ledger.record_archived(locations)
+        print(f"🗂️ {title}: перенесено {len(fresh)} рядків.")
+
+    delete_rows(live, runs)
+    forget_index(live)
+    print(f"🧹 З робочого аркуша видалено {len(old)} рядків, старших за {max_age_days} днів.")
+
+
+def update_archived_rows(ledger, updates, keep_columns=(), **kwargs):
+    """
+    Оновлює змінені записи у вкладках архіву.
+    updates: {(spreadsheet_url, tab): [(row_number, row, columns, row_hash), ...]}.
+    Повертає рядки, вкладку яких перейменовано або видалено, — їх треба додати заново.
+    """
+    orphaned = []
+    for (url, title), items in updates.items():
+        try:
+            worksheet = get_worksheet(name=title, url=url)
+        except gspread.WorksheetNotFound:
+            # Без цього кожна синхронізація падала б на тій самій вкладці
+            ledger.forget_archived([normalize_cell(row[ID_COLUMN]) for row_number, row, columns, row_hash in items])
+            orphaned.extend(row for row_number, row, columns, row_hash in items)
+            print(f"⚠️ Вкладку архіву '{title}' не знайдено — {len(items)} рядків буде додано в робочий аркуш.")
+            continue
+        writer = SheetWriter(worksheet)
+        writer.update_rows([(row_number, row, columns) for row_number, row, columns, row_hash in items],
+                           keep_columns=keep_columns, **kwargs)
+        ledger.mark_archived_updated(
+            [(normalize_cell(row[ID_COLUMN]), row_hash) for row_number, row, columns, row_hash in items]
+        )
+        print(f"🔁 {title}: оновлено {len(items)} рядків в архіві.")
+    return orphaned
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Переносить старі рядки робочого аркуша у вкладки архіву.")
+    parser.add_argument("--max-age-days", type=int, help="Вік рядків для архівації (за замовчуванням з ARCHIVE)")
+    parser.add_argument("--dry-run", action="store_true", help="Лише показати, скільки рядків і куди буде перенесено")
+    args = parser.parse_args()
+    run_archive(args.max_age_days, args.dry_run)
@@ -0,0 +1,171 @@
+"""
+Дозавантаження історії за довгий період.
+
+Період ділиться на вікна, вікна провайдера обробляються паралельно
+(в межах його лімітів), кожне готове вікно позначається в state.json —
+після збою повторний запуск продовжує з незавершених вікон.
+Рядки накопичуються в реєстрі, а в аркуш їх переносить завдання
+sheet_sync запущеного сервісу. Якщо сервіс зупинено — --sync переносить
+їх одним пакетним записом наприкінці (паралельно із сервісом не можна:
+обидва процеси додавали б ті самі рядки у ті самі номери рядків).
+
+    python backfill.py portmone --start 2023-01-01 --end 2025-01-01
+    python backfill.py privat mono --start 2024-01-01 --workers 2 --sync
+"""
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config_manager import config_manager
+from ledger import get_ledger
+from state_store import get_state, set_state
+from table import init_google_sheet
+from sheet_writer import SheetWriter
+from sheet_sync import sync_ledger_to_sheet
+from privat.privat import fetch_transactions, fetch_balances, store_privat_transactions
+from mono.mono import get_monobank_accounts, iter_monobank_transactions, build_mono_rows
+from portmone.check_payment_status import get_all_payment_statuses, store_orders
+from pipeline import store_batches
+from sync_cursor import token_id
+
+BACKFILL_SECTION = "backfill"
+
+# Розмір вікна (днів) і кількість паралельних вікон для кожного провайдера.
+# Mono додатково обмежений STATEMENT_LIMITER (1 запит/хв на токен).
+BACKFILL_LIMITS = {
+    "privat": {"window_days": 31, "workers": 3},
+    "mono": {"window_days": 31, "workers": 2},
+    "portmone": {"window_days": 30, "workers": 4},
+}
+
+
+def generate_date_ranges(start_date, end_date, delta_days=31):
+    current_start = start_date
+    while current_start < end_date:
+        current_end = min(current_start + timedelta(days=delta_days - 1), end_date)
+        yield current_start, current_end
+        current_start = current_end + timedelta(days=1)
+
+
+def privat_jobs(ledger, windows):
+    for entry in config_manager().get("PRIVAT", []):
+        api_token = entry.get("api_token")
+        if not api_token:
+            continue
+        acc_name_map = {b.get("acc"): b.get("nameACC") for b in fetch_balances(api_token)}
+
+        for start, end in windows:
+            def job(start=start, end=end, api_token=api_token, acc_name_map=acc_name_map):
+                transactions = fetch_transactions(
+                    api_token, start.strftime("%d-%m-%Y"), end.strftime("%d-%m-%Y"), strict=True
+                )
+                store_privat_transactions(ledger, transactions, acc_name_map)
+
+            yield f"privat:{token_id(api_token)}:{start}:{end}", end, job
+
+
+def mono_jobs(ledger, windows):
+    for entry in config_manager().get("MONO", []):
+        api_key = entry.get("api_token")
+        if not api_key:
+            continue
+        client_name, accounts = get_monobank_accounts(api_key)
+
+        for account_id, account_info in accounts.items():
+            iban = account_info.get("iban", f"Mono-{account_id}")
+            for start, end in windows:
+                def job(start=start, end=end, api_key=api_key, account_id=account_id,
+                        account_info=account_info, iban=iban, client_name=client_name):
+                    from_dt = datetime.combine(start, datetime.min.time())
+                    to_dt = datetime.combine(end, datetime.max.time())
+                    transactions = iter_monobank_transactions(account_id, api_key, from_dt, to_dt, strict=True)
+                    store_batches(ledger, "mono", transactions,
+                                  lambda batch: build_mono_rows(batch, client_name, iban, account_info))
+
+                yield f"mono:{token_id(api_key)}:{account_id}:{start}:{end}", end, job
+
+
+def portmone_jobs(ledger, windows):
+    for start, end in windows:
+        def job(start=start, end=end):
+            orders = get_all_payment_statuses(start.strftime("%d.%m.%Y"), end.strftime("%d.%m.%Y"), strict=True)
+            store_orders(ledger, orders)
+
+        yield f"portmone:{start}:{end}", end, job
+
+
+BACKFILL_PROVIDERS = {
+    "privat": privat_jobs,
+    "mono": mono_jobs,
+    "portmone": portmone_jobs,
+}
+
+
+def run_backfill(provider: str, start_date, end_date, ledger, workers=None, force=False):
+    """
+    Обробляє вікна провайдера паралельно. Завершене вікно позначається в state.json,
+    тож при повторному запуску воно пропускається (якщо не force).
+    Повертає кількість вікон, що завершились помилкою.
+    """
+    limits = BACKFILL_LIMITS[provider]
+    windows = list(generate_date_ranges(start_date, end_date, limits["window_days"]))
+    today = datetime.now().date()
+
+    jobs = [
+        (key, end, job) for key, end, job in BACKFILL_PROVIDERS[provider](ledger, windows)
+        if force or not get_state(BACKFILL_SECTION, key)
+    ]
+    print(f"🗂️ {provider}: {len(windows)} вікон, до обробки {len(jobs)} завдань.")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers or limits["workers"], thread_name_prefix=f"backfill-{provider}") as executor:
+        futures = {executor.submit(job): (key, end) for key, end, job in jobs}
+        for future in as_completed(futures):
+            key, end = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ Вікно {key} завершилось помилкою: {e}")
+                continue
+            # Вікно, що включає сьогодні, ще поповнюється — його не фіксуємо
+            if end < today:
+                set_state(BACKFILL_SECTION, key, True)
+            print(f"✅ Вікно {key} готове.")
+
+    return failed
+
+
+def parse_date(value: str):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Дозавантаження історії транзакцій у реєстр і Google Sheets.")
+    parser.add_argument("providers", nargs="+", choices=sorted(BACKFILL_PROVIDERS))
+    parser.add_argument("--start", type=parse_date, required=True, help="Початкова дата, YYYY-MM-DD")
+    parser.add_argument("--end", type=parse_date, default=datetime.now().date(),
+                        help="Кінцева дата, YYYY-MM-DD (за замовчуванням сьогодні)")
+    parser.add_argument("--workers", type=int, help="Паралельних вікон на провайдера")
+    parser.add_argument("--force", action="store_true", help="Ігнорувати збережений прогрес")
+    parser.add_argument("--sync", action="store_true",
+                        help="Наприкінці перенести реєстр в аркуш (лише коли сервіс не запущено)")
+    args = parser.parse_args()
+
+    ledger = get_ledger()
+    failed = 0
+    for provider in args.providers:
+        failed += run_backfill(provider, args.start, args.end, ledger, workers=args.workers, force=args.force)
+
+    if failed:
+        print(f"⚠️ {failed} вікон не завершено — запустіть команду ще раз, готові вікна буде пропущено.")
+
+    if args.sync:
+        # Один пакетний перенос усього накопиченого в реєстрі
+        print("📤 Переносимо реєстр в Google Sheets...")
+        sync_ledger_to_sheet(ledger, SheetWriter(init_google_sheet()))
+    else:
+        print("📥 Рядки в реєстрі — в аркуш їх перенесе sheet_sync сервісу (або запустіть з --sync).")
+
+
+if __name__ == "__main__":
+    main()
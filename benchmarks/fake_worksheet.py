@@ -0,0 +1,153 @@
+import re
+import json
+from collections import Counter
+
+A1_RE = re.compile(r"^([A-Z]+)(\d+)(?::([A-Z]+)(\d+)?)?$")
+
+
+def column_index(letters: str) -> int:
+    """A -> 0, Z -> 25, AA -> 26."""
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch) - ord("A") + 1)
+    return index - 1
+
+
+def _match_range(range_name: str):
+    match = A1_RE.match(range_name.split("!")[-1])
+    if not match:
+        raise ValueError(f"Непідтримуваний діапазон: {range_name}")
+    return match
+
+
+def parse_range(range_name: str):
+    """'A5:Y10' -> (рядок, колонка) лівого верхнього кута, нумерація з нуля."""
+    match = _match_range(range_name)
+    return int(match.group(2)) - 1, column_index(match.group(1))
+
+
+def parse_bounds(range_name: str):
+    """
+    'Q2:Q' -> (перший рядок, рядок після останнього або None, перша колонка, остання колонка),
+    нумерація з нуля.
+    """
+    match = _match_range(range_name)
+    start_col = column_index(match.group(1))
+    end_col = column_index(match.group(3)) if match.group(3) else start_col
+    if match.group(3) is None:
+        end_row = int(match.group(2))
+    else:
+        end_row = int(match.group(4)) if match.group(4) else None
+    return int(match.group(2)) - 1, end_row, start_col, end_col
+
+
+def _trim(values):
+    """Як Sheets API: без порожніх клітинок у кінці рядків і порожніх рядків у кінці діапазону."""
+    rows = []
+    for row in values:
+        while row and row[-1] in ("", None):
+            row = row[:-1]
+        rows.append(row)
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+class FakeWorksheet:
+    """
+    Аркуш у пам'яті з тими методами gspread.Worksheet, що використовує проєкт.
+    Кожен виклик рахується в calls, кількість записаних клітинок — в cells_written,
+    прочитаних — в cells_read і bytes_read (розмір JSON, як у відповіді API).
+    """
+
+    def __init__(self, rows=None, title="Аркуш1", row_count=None, col_count=26):
+        self.title = title
+        self.rows = [list(row) for row in rows or []]
+        self._row_count = row_count if row_count is not None else max(len(self.rows), 1000)
+        self._col_count = col_count
+        self.calls = Counter()
+        self.cells_written = 0
+        self.cells_read = 0
+        self.bytes_read = 0
+
+    @property
+    def row_count(self) -> int:
+        return self._row_count
+
+    @property
+    def col_count(self) -> int:
+        return self._col_count
+
+    def _read(self, values):
+        self.cells_read += sum(len(row) for row in values)
+        self.bytes_read += len(json.dumps(values, ensure_ascii=False, default=str))
+        return values
+
+    def _write(self, start_row: int, start_col: int, values):
+        if start_row + len(values) > self._row_count:
+            raise ValueError(f"Діапазон виходить за межі аркуша ({self._row_count} рядків)")
+        if any(start_col + len(row) > self._col_count for row in values):
+            raise ValueError(f"Діапазон виходить за межі аркуша ({self._col_count} колонок)")
+        while len(self.rows) < start_row + len(values):
+            self.rows.append([])
+        for offset, values_row in enumerate(values):
+            row = self.rows[start_row + offset]
+            if len(row) < start_col + len(values_row):
+                row.extend([""] * (start_col + len(values_row) - len(row)))
+            # None Sheets пропускає: клітинка лишається як була
+            for col, value in enumerate(values_row, start=start_col):
+                if value is not None:
+                    row[col] = value
+                    self.cells_written += 1
+
+    def get_all_values(self, **kwargs):
+        self.calls["get_all_values"] += 1
+        return self._read(_trim([list(row) for row in self.rows]))
+
+    def batch_get(self, ranges, **kwargs):
+        self.calls["batch_get"] += 1
+        result = []
+        for range_name in ranges:
+            start_row, end_row, start_col, end_col = parse_bounds(range_name)
+            values = [row[start_col:end_col + 1] for row in self.rows[start_row:end_row]]
+            result.append(self._read(_trim(values)))
+        return result
+
+    def row_values(self, row: int, **kwargs):
+        self.calls["row_values"] += 1
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def update(self, range_name, values=None, **kwargs):
+        self.calls["update"] += 1
+        start_row, start_col = parse_range(range_name)
+        self._write(start_row, start_col, values)
+        return {"updatedRange": range_name}
+
+    def batch_update(self, data, **kwargs):
+        self.calls["batch_update"] += 1
+        for item in data:
+            start_row, start_col = parse_range(item["range"])
+            self._write(start_row, start_col, item["values"])
+        return {"totalUpdatedRanges": len(data)}
+
+    def add_cols(self, cols: int):
+        self.calls["add_cols"] += 1
+        self._col_count += cols
+
+    def add_rows(self, rows: int):
+        self.calls["add_rows"] += 1
+        self._row_count += rows
+
+    def resize(self, rows=None, cols=None):
+        self.calls["resize"] += 1
+        if rows is not None:
+            self._row_count = rows
+        if cols is not None:
+            self._col_count = cols
+
+    def append_rows(self, values, **kwargs):
+        self.calls["append_rows"] += 1
+        start_row = len(self.rows)
+        self._row_count = max(self._row_count, start_row + len(values))
+        self._write(start_row, 0, values)
+        return {"updates": {"updatedRows": len(values)}}
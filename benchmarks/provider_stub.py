@@ -0,0 +1,280 @@
+import copy
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Записи розкладаються рівномірно на останні 4 доби — всередині вікна days=5
+RECORDS_SPAN_SECONDS = 4 * 86400
+
+
+def load_fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ProviderData:
+    """
+    Синтетичні відповіді провайдерів на основі записаних фікстур.
+    Запис i генерується на льоту (id, час, сума), тож заглушка майже не займає пам'яті.
+    """
+
+    def __init__(self, records: int, id_offset: int = 0):
+        self.records = records
+        self.id_offset = id_offset
+        self.now = time.time()
+        self.fixtures = {name: load_fixture(name) for name in
+                         ("privat", "mono", "etherscan", "tronscan", "portmone", "fakturownia")}
+
+    def record_id(self, provider: str, i: int) -> str:
+        return f"{provider}-{i + self.id_offset}"
+
+    def timestamp(self, i: int) -> float:
+        """Запис 0 — найновіший."""
+        return self.now - 60 - i * RECORDS_SPAN_SECONDS / max(self.records, 1)
+
+    def privat(self, i: int) -> dict:
+        tx = copy.copy(self.fixtures["privat"]["transaction"])
+        dt = datetime.fromtimestamp(self.timestamp(i))
+        tx.update(ID=self.record_id("privat", i), DAT_KL=dt.strftime("%d.%m.%Y"), TIM_P=dt.strftime("%H:%M"),
+                  SUM=f"{100 + i % 997},{i % 100:02d}", SUM_E=f"{100 + i % 997},{i % 100:02d}",
+                  TRANTYPE="D" if i % 2 else "C")
+        return tx
+
+    def mono(self, i: int) -> dict:
+        tx = copy.copy(self.fixtures["mono"]["transaction"])
+        amount = (1000 + i % 50000) * (-1 if i % 2 else 1)
+        tx.update(id=self.record_id("mono", i), time=int(self.timestamp(i)),
+                  amount=amount, operationAmount=amount, balance=10_000_000 + i)
+        return tx
+
+    def etherscan(self, i: int, address: str) -> dict:
+        tx = copy.copy(self.fixtures["etherscan"]["transaction"])
+        # Etherscan віддає по зростанню блоку, тож тут навпаки: запис 0 — найстаріший
+        j = self.records - 1 - i
+        tx.update(hash=self.record_id("erc20", i), timeStamp=str(int(self.timestamp(j))),
+                  blockNumber=str(22_800_000 + i), value=str((1 + i % 1000) * 1_000_000),
+                  to=address if i % 2 else tx["to"])
+        return tx
+
+    def tronscan(self, i: int, address: str) -> dict:
+        tx = copy.deepcopy(self.fixtures["tronscan"]["transaction"])
+        tx.update(transaction_id=self.record_id("trc20", i), block_ts=int(self.timestamp(i) * 1000),
+                  quant=str((1 + i % 1000) * 1_000_000), to_address=address if i % 2 else tx["to_address"])
+        return tx
+
+    def portmone(self, i: int) -> dict:
+        order = copy.copy(self.fixtures["portmone"]["order"])
+        dt = datetime.fromtimestamp(self.timestamp(i))
+        order.update(shopBillId=self.record_id("portmone", i), pay_date=dt.strftime("%d.%m.%Y %H:%M:%S"),
+                     billAmount=f"{100 + i % 997}.00", status="PAYED" if i % 3 else "CREATED")
+        return order
+
+    def invoice(self, provider: str, i: int) -> dict:
+        invoice = copy.copy(self.fixtures["fakturownia"]["invoice"])
+        dt = datetime.fromtimestamp(self.timestamp(i), tz=timezone.utc).isoformat(timespec="milliseconds")
+        invoice.update(id=self.record_id(provider, i), created_at=dt, updated_at=dt,
+                       price_gross=f"{100 + i % 997}.00", number=f"FV {i}/2025")
+        return invoice
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method: str):
+        # Шлях має вигляд /<оригінальний хост>/<оригінальний шлях>
+        parts = urlsplit(self.path)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        path = "/" + path
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        body = None
+        if method == "POST":
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+        self.server.count_call(host)
+        handler = ROUTES.get(host)
+        if handler is None:
+            self._send_json({"error": f"unknown host {host}"}, status=404)
+            return
+        payload, status = handler(self.server.data, path, query, body)
+        self._send_json(payload, status)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+
+def _privat(data, path, query, body):
+    if path.endswith("/balance/final"):
+        return {"status": "SUCCESS", "exist_next_page": False, "balances": data.fixtures["privat"]["balances"]}, 200
+    limit = int(query.get("limit", 100))
+    start = int(query.get("followId", 0) or 0)
+    end = min(start + limit, data.records)
+    return {
+        "status": "SUCCESS",
+        "exist_next_page": end < data.records,
+        "next_page_id": str(end),
+        "transactions": [data.privat(i) for i in range(start, end)],
+    }, 200
+
+
+def _mono(data, path, query, body):
+    if path == "/personal/client-info":
+        return data.fixtures["mono"]["client_info"], 200
+    if path.startswith("/personal/statement/"):
+        from_time, to_time = (int(value) for value in path.rstrip("/").split("/")[-2:])
+        # Mono віддає не більше 500 транзакцій за запит, від найновіших
+        txs = []
+        for i in range(data.records):
+            ts = data.timestamp(i)
+            if ts > to_time:
+                continue
+            if ts < from_time or len(txs) >= 500:
+                break
+            txs.append(data.mono(i))
+        return txs, 200
+    if path == "/bank/currency":
+        return [], 200
+    return {"errorDescription": "unknown method"}, 404
+
+
+def _etherscan(data, path, query, body):
+    if query.get("module") == "block":
+        return {"status": "1", "message": "OK", "result": "22800000"}, 200
+    page = int(query.get("page", 1))
+    offset = int(query.get("offset", 100))
+    start_block = int(query.get("startblock", 0))
+    first = max(0, start_block - 22_800_000)
+    start = first + (page - 1) * offset
+    end = min(start + offset, data.records)
+    txs = [data.etherscan(i, query.get("address", "")) for i in range(start, end)]
+    return {"status": "1" if txs else "0", "message": "OK", "result": txs}, 200
+
+
+def _records_between(data, from_ms: int, to_ms: int):
+    """Індекси записів з block_ts у [from_ms, to_ms), від найновіших."""
+    return [i for i in range(data.records) if from_ms <= int(data.timestamp(i) * 1000) < to_ms]
+
+
+def _tronscan(data, path, query, body):
+    start = int(query.get("start", 0))
+    limit = int(query.get("limit", 50))
+    address = query.get("relatedAddress", "")
+    indexes = _records_between(data, int(query.get("start_timestamp", 0)), int(query.get("end_timestamp", 2 ** 62)))
+    page = indexes[start:start + limit]
+    return {"total": len(indexes), "token_transfers": [data.tronscan(i, address) for i in page]}, 200
+
+
+def _trongrid(data, path, query, body):
+    address = path.split("/")[3]
+    limit = int(query.get("limit", 20))
+    offset = int(query.get("fingerprint", 0) or 0)
+    indexes = _records_between(data, int(query.get("min_timestamp", 0)), int(query.get("max_timestamp", 2 ** 62)) + 1)
+    page = indexes[offset:offset + limit]
+    transfers = []
+    for i in page:
+        tx = data.tronscan(i, address)
+        transfers.append({
+            "transaction_id": tx["transaction_id"],
+            "block_timestamp": tx["block_ts"],
+            "from": tx["from_address"],
+            "to": tx["to_address"],
+            "type": "Transfer",
+            "value": tx["quant"],
+            "token_info": tx["token_info"],
+        })
+    meta = {"page_size": len(page)}
+    if offset + limit < len(indexes):
+        meta["fingerprint"] = str(offset + limit)
+    return {"success": True, "data": transfers, "meta": meta}, 200
+
+
+def _portmone(data, path, query, body):
+    params = (body or {}).get("params", {}).get("data", {})
+    start = datetime.strptime(params.get("startDate", "01.01.1970"), "%d.%m.%Y").timestamp()
+    end = datetime.strptime(params.get("endDate", "01.01.2100"), "%d.%m.%Y").timestamp() + 86400
+    orders = [data.portmone(i) for i in range(data.records) if start <= data.timestamp(i) < end]
+    return {"result": {"orders": orders}}, 200
+
+
+def _invoices(provider):
+    def handler(data, path, query, body):
+        page = int(query.get("page", 1))
+        per_page = int(query.get("per_page", 25))
+        start = (page - 1) * per_page
+        end = min(start + per_page, data.records)
+        return [data.invoice(provider, i) for i in range(start, end)], 200
+    return handler
+
+
+ROUTES = {
+    "acp.privatbank.ua": _privat,
+    "api.monobank.ua": _mono,
+    "api.etherscan.io": _etherscan,
+    "apilist.tronscanapi.com": _tronscan,
+    "api.trongrid.io": _trongrid,
+    "www.portmone.com.ua": _portmone,
+    "orgwa.fakturownia.pl": _invoices("fakturownia"),
+    "handleua.bitfaktura.com.ua": _invoices("bitfactura"),
+}
+
+
+class ProviderStubServer(ThreadingHTTPServer):
+    """Локальна заміна API всіх провайдерів; рахує запити по хостах."""
+
+    daemon_threads = True
+
+    def __init__(self, data: ProviderData, host="127.0.0.1", port=0):
+        super().__init__((host, port), _StubHandler)
+        self.data = data
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_call(self, host: str):
+        with self._calls_lock:
+            self.calls[host] += 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="provider-stub", daemon=True).start()
+        return self
+
+
+def redirect_session_to(session, base_url: str):
+    """
+    Перенаправляє https-запити спільної сесії http_client на заглушку:
+    https://api.monobank.ua/x -> {base_url}/api.monobank.ua/x. Код експортерів не змінюється.
+    """
+    from requests.adapters import HTTPAdapter
+
+    class LocalRedirectAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            parts = urlsplit(request.url)
+            request.url = f"{base_url}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+            return super().send(request, **kwargs)
+
+    session.mount("https://", LocalRedirectAdapter(pool_connections=10, pool_maxsize=10))
@@ -0,0 +1,202 @@
+"""
+Офлайн-бенчмарк конвеєра експорту без справжніх токенів і Google Sheets.
+
+Експортери працюють без змін: спільна сесія http_client перенаправляється
+на локальну заглушку API провайдерів (provider_stub), а синхронізація пише
+в аркуш у пам'яті (FakeWorksheet), попередньо заповнений size рядками.
+Половина отриманих записів збігається з рядками аркуша (шлях оновлення),
+решта — нові (шлях додавання).
+
+Для кожного розміру аркуша друкується час, пікова пам'ять (tracemalloc
+трохи сповільнює виконання, тож час порівнюйте між запусками бенчмарку),
+кількість запитів до API і викликів аркуша, обсяг прочитаного з аркуша.
+Повні підсумки з таймінгами етапів — у файлі --output.
+
+    python benchmarks/run.py
+    python benchmarks/run.py --sizes 10000 --records 2000 --providers mono privat
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import argparse
+import contextlib
+import json
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_RECORDS = 1_000
+
+BENCH_CONFIG = {
+    "PRIVAT": [{"api_token": "bench-privat", "days": 5}],
+    "MONO": [{"api_token": "bench-mono", "days": 5}],
+    "ERC20": [{"address": "0x00000000000000000000000000000000bench001", "api_key": "bench", "days": 5}],
+    "TRC20": [{"address": "TBenchWa11etAddre55000000000000001", "days": 5}],
+    "PORTMONE": [{"payee_id": "1000", "login": "bench", "password": "bench", "days": 5}],
+    "FACTUROWNIA": [{"api_token": "bench-fakturownia", "days": 5}],
+    "BITFACTURA": [{"api_token": "bench-bitfactura", "days": 5}],
+}
+
+
+class _NoSleepTime:
+    """Модуль time без пауз між сторінками — заглушці вони не потрібні."""
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+
+def prefilled_rows(size: int, providers):
+    """Заголовок + size рядків; id рядків — ті самі, що віддає заглушка (<провайдер>-<n>)."""
+    header = ["Дата", "Джерело", "Назва рахунку", "Рахунок", "Тип", "Сума", "Сума операції", "Валюта"]
+    rows = [header + [""] * (25 - len(header))]
+    base_serial = (datetime.now() - timedelta(days=30) - datetime(1899, 12, 30)).total_seconds() / 86400
+    for j in range(size):
+        provider = providers[j % len(providers)]
+        row = [""] * 25
+        row[0] = round(base_serial + j / 1440, 6)
+        row[1] = provider
+        row[4] = "credit"
+        row[5] = row[6] = j % 1000
+        row[7] = "UAH"
+        row[16] = f"{provider}-{j // len(providers)}"
+        rows.append(row)
+    return rows
+
+
+def run_scenario(size, records, selected, server, workdir, verbose=False):
+    from ledger import Ledger
+    from metrics import METRICS, timed
+    from sheet_writer import SheetWriter
+    from sheet_sync import sync_ledger_to_sheet
+    from benchmarks.fake_worksheet import FakeWorksheet
+    from benchmarks.provider_stub import ProviderData
+
+    keys = [key for key, title, export in selected]
+    # Кожен сценарій — перший запуск: без курсорів і з порожнім реєстром
+    for name in ("state.json", "ledger.db"):
+        if os.path.exists(name):
+            os.remove(name)
+
+    worksheet = FakeWorksheet(prefilled_rows(size, keys))
+    server.data = ProviderData(records, id_offset=max(0, size // len(keys) - records // 2))
+    server.calls.clear()
+    ledger = Ledger("ledger.db")
+
+    output = None if verbose else open(os.devnull, "w", encoding="utf-8")
+    started_at = time.time()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+        failures = {}
+        for key, title, export in selected:
+            # Напряму, а не через main.run_provider: той лише друкує помилку, а вивід тут прихований
+            try:
+                with timed(f"provider.{key}"):
+                    export(ledger)
+            except Exception as e:
+                failures[key] = f"{type(e).__name__}: {e}"
+        fetched = time.perf_counter()
+        sync_ledger_to_sheet(ledger, SheetWriter(worksheet))
+    finished = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if output:
+        output.close()
+    ledger.close()
+
+    summary = METRICS.flush(started_at, path=os.path.join(workdir, "metrics.jsonl"))
+    # Експортер може перехопити власну помилку — тоді видно лише, що в реєстр нічого не потрапило
+    for key in keys:
+        if key not in failures and not summary["counters"].get(f"rows_inserted.{key}"):
+            failures[key] = "жодного запису в реєстрі"
+    return {
+        "sheet_rows": size,
+        "records_per_provider": records,
+        "providers": keys,
+        "seconds": round(finished - started, 3),
+        "fetch_seconds": round(fetched - started, 3),
+        "sync_seconds": round(finished - fetched, 3),
+        "peak_memory_mb": round(peak / 2 ** 20, 2),
+        "api_calls": dict(server.calls),
+        "sheet_calls": dict(worksheet.calls),
+        "failures": failures,
+        "cells_written": worksheet.cells_written,
+        "cells_read": worksheet.cells_read,
+        "bytes_read": worksheet.bytes_read,
+        "timings": summary["timings"],
+        "counters": summary["counters"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк експорту: заглушки API і аркуш у пам'яті.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Кількість рядків в аркуші перед запуском")
+    parser.add_argument("--records", type=int, default=DEFAULT_RECORDS, help="Записів у кожного провайдера")
+    parser.add_argument("--providers", nargs="+", help="Ключі провайдерів з main.PROVIDERS (за замовчуванням усі)")
+    parser.add_argument("--keep-sleeps", action="store_true", help="Не прибирати паузи між сторінками")
+    parser.add_argument("--output", default="benchmark_results.json", help="Куди записати повні результати")
+    parser.add_argument("--verbose", action="store_true", help="Показувати вивід експортерів")
+    args = parser.parse_args()
+    output_path = os.path.abspath(args.output)
+
+    workdir = tempfile.mkdtemp(prefix="export-bench-")
+    os.chdir(workdir)
+    with open("config.json", "w", encoding="utf-8") as f:
+        json.dump(BENCH_CONFIG, f)
+
+    import retry
+    import mono.mono
+    import etherscan.etherscan
+    import tronscan.transactions
+    from http_client import get_session
+    from main import PROVIDERS
+    from benchmarks.provider_stub import ProviderStubServer, ProviderData, redirect_session_to
+
+    # У заглушки немає лімітів: прибираємо очікування, щоб міряти власний код
+    retry.SHEETS_READ_QUOTA.per_minute = retry.SHEETS_WRITE_QUOTA.per_minute = 10 ** 9
+    mono.mono.STATEMENT_LIMITER.interval = mono.mono.CLIENT_INFO_LIMITER.interval = 0
+    if not args.keep_sleeps:
+        etherscan.etherscan.time = tronscan.transactions.time = _NoSleepTime()
+
+    selected = [p for p in PROVIDERS if not args.providers or p[0] in args.providers]
+    if not selected:
+        print(f"❌ Невідомі провайдери: {', '.join(args.providers)}")
+        return
+
+    server = ProviderStubServer(ProviderData(args.records)).start()
+    redirect_session_to(get_session(), server.base_url)
+    print(f"🧪 Бенчмарк у {workdir}, заглушка API: {server.base_url}")
+
+    results = []
+    failed = False
+    for size in args.sizes:
+        print(f"\n⏱️ Аркуш на {size} рядків, {args.records} записів × {len(selected)} провайдерів...")
+        result = run_scenario(size, args.records, selected, server, workdir, verbose=args.verbose)
+        results.append(result)
+        print(
+            f"✅ {result['seconds']:.2f} с (отримання {result['fetch_seconds']:.2f} с, "
+            f"синхронізація {result['sync_seconds']:.2f} с), пам'ять {result['peak_memory_mb']} МБ, "
+            f"запитів API {sum(result['api_calls'].values())}, викликів аркуша {sum(result['sheet_calls'].values())}, "
+            f"записано клітинок {result['cells_written']}, прочитано {result['bytes_read'] / 2 ** 20:.1f} МБ"
+        )
+        for key, error in result["failures"].items():
+            print(f"❌ {key}: {error}")
+            failed = True
+
+    server.shutdown()
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 Повні результати: {output_path}")
+    if failed:
+        sys.exit("❌ Частина провайдерів завершилась помилкою — результати неповні.")
+
+
+if __name__ == "__main__":
+    main()
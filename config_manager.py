@@ -1,20 +1,84 @@
 import json
+import os
+import threading
 
 CONFIG_FILE = "config.json"
 
+# Обов'язкові поля кожного запису в секціях провайдерів
+REQUIRED_FIELDS = {
+    "PRIVAT": ("api_token",),
+    "MONO": ("api_token",),
+    "ERC20": ("address", "api_key"),
+    "TRC20": ("address",),
+    "PORTMONE": ("payee_id", "login", "password"),
+    "FACTUROWNIA": ("api_token",),
+    "BITFACTURA": ("api_token",),
+}
+
+_cache = {"mtime": None, "config": None}
+_lock = threading.Lock()
+
+
+def validate_config(config: dict):
+    """Перевіряє секції провайдерів один раз при завантаженні й друкує попередження."""
+    for section, fields in REQUIRED_FIELDS.items():
+        entries = config.get(section)
+        if entries is None:
+            continue
+        if not isinstance(entries, list):
+            print(f"⚠️ Конфіг: секція {section} має бути списком.")
+            continue
+        for i, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                print(f"⚠️ Конфіг: {section}[{i}] має бути об'єктом.")
+                continue
+            missing = [field for field in fields if not entry.get(field)]
+            if missing:
+                print(f"⚠️ Конфіг: {section}[{i}] без полів {', '.join(missing)}.")
+            days = entry.get("days")
+            if days is not None and not isinstance(days, int):
+                print(f"⚠️ Конфіг: {section}[{i}].days має бути цілим числом, а не {days!r}.")
+            overlap = entry.get("overlap_hours")
+            if overlap is not None and (isinstance(overlap, bool) or not isinstance(overlap, (int, float)) or overlap < 0):
+                print(f"⚠️ Конфіг: {section}[{i}].overlap_hours має бути невід'ємним числом, а не {overlap!r}.")
+
+
 def config_manager(new_config=None):
     """
-    Якщо new_config не переданий — завантажує конфіг і повертає його.
+    Якщо new_config не переданий — повертає конфіг із пам'яті; файл перечитується
+    лише тоді, коли змінився його mtime. Повернений словник спільний — не змінюйте його.
     Якщо переданий словник new_config — просто повертає його, не перезаписуючи файл.
     """
-    if new_config is None:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        return config
-    else:
+    if new_config is not None:
         # Не перезаписуємо файл, а просто повертаємо новий конфіг
         return new_config
 
+    with _lock:
+        try:
+            mtime = os.stat(CONFIG_FILE).st_mtime_ns
+        except OSError:
+            if _cache["config"] is not None:
+                return _cache["config"]
+            raise
+
+        if mtime != _cache["mtime"]:
+            try:
+                with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                    config = json.load(f)
+            except ValueError as e:
+                # Файл редагують просто зараз — працюємо зі старою версією
+                if _cache["config"] is None:
+                    raise
+                print(f"❌ Не вдалося перечитати {CONFIG_FILE}, лишаємо попередній конфіг: {e}")
+                _cache["mtime"] = mtime
+                return _cache["config"]
+            validate_config(config)
+            _cache["mtime"] = mtime
+            _cache["config"] = config
+            print(f"🔧 Конфіг {CONFIG_FILE} завантажено.")
+
+        return _cache["config"]
+
 
 
 # Додайте це на початку файлу
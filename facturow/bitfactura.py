@@ -1,61 +1,41 @@
-import requests
-from datetime import datetime, timezone, timedelta
-import gspread
+from datetime import datetime
 import re
-from oauth2client.service_account import ServiceAccountCredentials
 from config_manager import config_manager
+from ledger import get_ledger
+from http_client import http_get
+from pipeline import store_batches
+from normalize import iso_serial_dates, amounts, emit_rows
+from sync_cursor import sync_window, save_cursor, token_id, cursor_overlap
 
 
 
-def format_amount(value):
-    try:
-        return round(float(value), 2)
-    except (ValueError, TypeError):
-        return 0.00
-
-def convert_to_serial_date(date_str):
-    try:
-        # Вирізаємо часову зону у вигляді +02:00 або -03:00
-        # і перетворюємо у формат, який розуміє fromisoformat (без двокрапки в зоні)
-        # Приклад: 2025-07-01T11:28:13.000+02:00 -> 2025-07-01T11:28:13.000+0200
-        if date_str[-3] == ':':
-            date_str = date_str[:-3] + date_str[-2:]
-        
-        dt = datetime.fromisoformat(date_str)
-
-        # Конвертація дати з часовою зоною в UTC
-        if dt.tzinfo is not None:
-            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
-
-        epoch = datetime(1899, 12, 30)
-        delta = dt - epoch
-        return delta.days + (delta.seconds + delta.microseconds / 1e6) / 86400
-    except Exception as e:
-        print(f"⚠️ Помилка при конвертації дати {date_str}: {e}")
-        return date_str
-
-
-def export_bitfactura_invoices_to_google_sheets(worksheet, api_token, from_date=None, to_date=None):
+def export_bitfactura_invoices_to_google_sheets(ledger, api_token, from_date=None, to_date=None):
     BASE_URL = "https://handleua.bitfaktura.com.ua"
 
+    PER_PAGE = 100
+
     def get_invoices(page=1):
         url = f"{BASE_URL}/invoices.json"
-        params = {"api_token": api_token, "page": page}
-        response = requests.get(url, params=params)
+        # Сортуємо від нещодавно змінених, щоб зупинитись на першій старшій за вікно сторінці
+        params = {"api_token": api_token, "page": page, "per_page": PER_PAGE, "order": "updated_at.desc"}
+        response = http_get(url, params=params)
         if response.status_code == 200:
             return response.json()
         else:
             print("❌ Помилка:", response.status_code, response.text)
-            return []
+            # Виняток, а не порожня сторінка: інакше збій виглядав би як кінець списку
+            raise Exception(f"HTTP {response.status_code}")
 
     def get_all_invoices():
-        all_invoices = []
+        # Генератор: інвойси віддаються посторінково, без накопичення всього списку
         page = 1
         while True:
             invoices = get_invoices(page)
             if not invoices:
                 break
 
+            page_size = len(invoices)
+            reached_older = False
             if from_date or to_date:
                 filtered = []
                 for inv in invoices:
@@ -63,78 +43,44 @@ def export_bitfactura_invoices_to_google_sheets(worksheet, api_token, from_date=
                     if updated:
                         inv_date = datetime.fromisoformat(updated.replace("Z", "+00:00")).date()
                         if from_date and inv_date < from_date:
+                            reached_older = True
                             continue
                         if to_date and inv_date > to_date:
                             continue
                     filtered.append(inv)
                 invoices = filtered
 
-            all_invoices.extend(invoices)
             print(f"✅ Отримано сторінку {page} — {len(invoices)} інвойсів")
+            yield from invoices
 
-            if len(invoices) < 100:
+            if reached_older or page_size < PER_PAGE:
                 break
             page += 1
-        return all_invoices
-
-    invoices = get_all_invoices()
-
-    existing_rows = worksheet.get_all_values()
-    header_offset = 1
-    existing_invoices_by_id = {}
-    for i, row in enumerate(existing_rows[header_offset:], start=header_offset + 1):
-        full_row = row + [""] * (17 - len(row))
-        inv_id = full_row[16]
-        if inv_id:
-            existing_invoices_by_id[inv_id] = {"row_number": i, "row_data": full_row}
-
-    rows_to_update = []
-    rows_to_append = []
-
-    for invoice in invoices:
-        row = [""] * 17
-        row[0] = convert_to_serial_date(invoice.get("created_at", ""))
-        row[1] = "bitfaktura"
-        row[3] = invoice.get("seller_bank_account", "")
-        row[4] = "invoice"
-        amount = invoice.get("price_gross", 0)
-        row[5] = format_amount(amount)
-        row[6] = format_amount(amount)
-        row[7] = invoice.get("currency", "")
-        row[10] = invoice.get("number", "")
-        row[11] = invoice.get("buyer_name", "")
-        row[12] = int(invoice.get("buyer_tax_no", ""))
-        row[13] = invoice.get("buyer_bank_account", "")
-        row[16] = str(invoice.get("id", ""))
-
-        inv_id = row[16]
-        if inv_id in existing_invoices_by_id:
-            existing = existing_invoices_by_id[inv_id]
-            if row != existing["row_data"]:
-                rows_to_update.append((existing["row_number"], row))
-        else:
-            rows_to_append.append(row)
-
-    for row_number, row_data in rows_to_update:
-        worksheet.update(f"A{row_number}:Q{row_number}", [row_data])
-        print(f"🔁 Оновлено інвойс у рядку {row_number}")
-
-    if rows_to_append:
-        start_row = len(existing_rows) + 1
-        worksheet.update(f"A{start_row}:Q{start_row + len(rows_to_append) - 1}", rows_to_append)
-        print(f"➕ Додано {len(rows_to_append)} нових інвойсів з рядка {start_row}")
-    else:
-        print("✅ Нових інвойсів для додавання немає.")
 
-
-def export_bitfactura_all_to_google_sheets():
+    def build_rows(invoices):
+        amount_values = amounts([invoice.get("price_gross", 0) for invoice in invoices], absolute=False)
+        return emit_rows(len(invoices), {
+            0: iso_serial_dates([invoice.get("created_at", "") for invoice in invoices]),
+            1: "bitfaktura",
+            3: [invoice.get("seller_bank_account", "") for invoice in invoices],
+            4: "invoice",
+            5: amount_values,
+            6: amount_values,
+            7: [invoice.get("currency", "") for invoice in invoices],
+            10: [invoice.get("number", "") for invoice in invoices],
+            11: [invoice.get("buyer_name", "") for invoice in invoices],
+            12: [int(invoice.get("buyer_tax_no", "")) for invoice in invoices],
+            13: [invoice.get("buyer_bank_account", "") for invoice in invoices],
+            16: [str(invoice.get("id", "")) for invoice in invoices],
+        }, width=17)
+
+    store_batches(ledger, "bitfactura", get_all_invoices(), build_rows)
+
+
+def export_bitfactura_all_to_google_sheets(ledger=None):
     CONFIG = config_manager()
-    sheet_conf = CONFIG["google_sheet"]
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(sheet_conf["credentials_path"], scope)
-    client = gspread.authorize(creds)
-    spreadsheet = client.open_by_url(sheet_conf["spreadsheet_url"])
-    worksheet = spreadsheet.worksheet(sheet_conf["worksheet_name"])
+    if ledger is None:
+        ledger = get_ledger()
 
     bitfactura_entries = CONFIG.get("BITFACTURA", [])
 
@@ -146,8 +92,16 @@ def export_bitfactura_all_to_google_sheets():
         token = entry.get("api_token")
         days = entry.get("days", 5)
 
-        from_date = datetime.now().date() - timedelta(days=days)
-        to_date = datetime.now().date()
+        # Від курсора попереднього запуску; days — лише для першого
+        account = token_id(token)
+        from_dt, to_dt = sync_window("bitfactura", account, days, cursor_overlap(entry))
+        from_date, to_date = from_dt.date(), to_dt.date()
 
         print(f"📡 Обробка токена: {token[:6]}..., діапазон дат: {from_date} - {to_date}")
-        export_bitfactura_invoices_to_google_sheets(worksheet, token, from_date=from_date, to_date=to_date)
+        try:
+            export_bitfactura_invoices_to_google_sheets(ledger, token, from_date=from_date, to_date=to_date)
+        except Exception as e:
+            print(f"❌ Інвойси не отримано повністю, курсор не зсуваємо: {e}")
+            continue
+
+        save_cursor("bitfactura", account, to_dt)
@@ -0,0 +1,71 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from config_manager import config_manager
+from retry import request_with_retry, MAX_ATTEMPTS
+from metrics import timed, count
+
+DEFAULT_TIMEOUT = 30
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+
+_session = None
+_timeout = DEFAULT_TIMEOUT
+_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Спільна сесія для всіх провайдерів: keep-alive і пул з'єднань на хост,
+    тож сторінки пагінації не відкривають нове TCP+TLS з'єднання щоразу.
+    Налаштування — секція HTTP у config.json (timeout, pool_connections, pool_maxsize).
+    """
+    global _session, _timeout
+    with _lock:
+        if _session is None:
+            http_conf = config_manager().get("HTTP", {})
+            _timeout = http_conf.get("timeout", DEFAULT_TIMEOUT)
+
+            adapter = HTTPAdapter(
+                pool_connections=http_conf.get("pool_connections", POOL_CONNECTIONS),
+                pool_maxsize=http_conf.get("pool_maxsize", POOL_MAXSIZE),
+                pool_block=True,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept-Encoding": "gzip, deflate"})
+            _session = session
+        return _session
+
+
+def _instrumented(url, send):
+    """Кожна спроба запиту (сторінка API) — таймінг http.<хост> і лічильники запитів і байтів."""
+    host = urlsplit(url).netloc
+
+    def call():
+        count("http_requests")
+        with timed(f"http.{host}"):
+            response = send()
+        count("http_bytes", len(response.content))
+        return response
+
+    return call
+
+
+def http_get(url, timeout=None, max_attempts=MAX_ATTEMPTS, limiter=None, limiter_key=None, **kwargs) -> requests.Response:
+    """GET з повторами при 429/5xx (див. retry.request_with_retry)."""
+    session = get_session()
+    return request_with_retry(
+        _instrumented(url, lambda: session.get(url, timeout=timeout or _timeout, **kwargs)),
+        max_attempts=max_attempts, limiter=limiter, limiter_key=limiter_key,
+    )
+
+
+def http_post(url, timeout=None, max_attempts=MAX_ATTEMPTS, limiter=None, limiter_key=None, **kwargs) -> requests.Response:
+    session = get_session()
+    return request_with_retry(
+        _instrumented(url, lambda: session.post(url, timeout=timeout or _timeout, **kwargs)),
+        max_attempts=max_attempts, limiter=limiter, limiter_key=limiter_key,
+    )
@@ -0,0 +1,200 @@
+import sqlite3
+import threading
+import time
+from sheet_index import row_hash, normalize_cell, ROW_WIDTH, ID_COLUMN
+
+LEDGER_FILE = "ledger.db"
+# Обмеження SQLite на кількість параметрів у запиті
+SQL_VARIABLES_CHUNK = 500
+# changed_mask для рядків, яких ще немає в аркуші або для яких зміни невідомі: усі колонки
+ALL_COLUMNS_MASK = -1
+
+# Назви 25 колонок аркуша (A:Y); R:Y експортери поки не заповнюють
+COLUMNS = [
+    "date_serial", "source", "account_name", "account", "operation_type",
+    "amount", "operation_amount", "currency", "fee", "balance",
+    "purpose", "counterparty_name", "counterparty_code", "counterparty_account", "mcc",
+    "description", "tx_id", "col_r", "col_s", "col_t",
+    "col_u", "col_v", "col_w", "col_x", "col_y",
+]
+
+
+def changed_columns(mask: int):
+    """Індекси колонок з маски changed_mask; None — невідомо, треба писати весь рядок."""
+    if mask < 0:
+        return None
+    return [col for col in range(ROW_WIDTH) if mask >> col & 1]
+
+
+class Ledger:
+    """
+    Локальний реєстр транзакцій у SQLite з ключем (provider, tx_id).
+    Експортери роблять upsert сюди, а окремий етап синхронізації
+    переносить в аркуш тільки змінені (dirty) записи.
+    """
+
+    def __init__(self, path=LEDGER_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._create_schema()
+
+    def _create_schema(self):
+        columns_sql = ",\n".join(f"    {name}" for name in COLUMNS if name != "tx_id")
+        with self.lock, self.conn:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS ledger (
+                    provider TEXT NOT NULL,
+                    tx_id TEXT NOT NULL,
+                {columns_sql},
+                    width INTEGER NOT NULL,
+                    row_hash TEXT NOT NULL,
+                    dirty INTEGER NOT NULL DEFAULT 1,
+                    changed_mask INTEGER NOT NULL DEFAULT -1,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (provider, tx_id)
+                )
+            """)
+            # Бітова маска колонок, змінених з останньої синхронізації; реєстри до її появи — "усі колонки"
+            existing_columns = {row[1] for row in self.conn.execute("PRAGMA table_info(ledger)")}
+            if "changed_mask" not in existing_columns:
+                self.conn.execute("ALTER TABLE ledger ADD COLUMN changed_mask INTEGER NOT NULL DEFAULT -1")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ledger_dirty ON ledger (dirty) WHERE dirty = 1")
+            # Де лежать рядки, перенесені архіватором з робочого аркуша: tx_id -> вкладка і рядок
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS sheet_archive (
+                    tx_id TEXT PRIMARY KEY,
+                    spreadsheet_url TEXT NOT NULL,
+                    tab TEXT NOT NULL,
+                    row_number INTEGER NOT NULL,
+                    row_hash TEXT NOT NULL,
+                    archived_at REAL NOT NULL
+                )
+            """)
+
+    def upsert_rows(self, provider: str, rows) -> tuple:
+        """
+        Записує рядки провайдера. Незмінені рядки (той самий хеш) пропускаються.
+        Для змінених накопичується маска змінених колонок — в аркуш піде лише вона.
+        Повертає (кількість нових, кількість змінених).
+        """
+        inserted = changed = 0
+        now = time.time()
+        with self.lock, self.conn:
+            for row in rows:
+                tx_id = str(row[ID_COLUMN])
+                if not tx_id:
+                    continue
+                new_hash = row_hash(row)
+                existing = self.conn.execute(
+                    f"SELECT row_hash, dirty, changed_mask, {', '.join(COLUMNS)} FROM ledger "
+                    "WHERE provider = ? AND tx_id = ?",
+                    (provider, tx_id),
+                ).fetchone()
+                if existing and existing[0] == new_hash:
+                    continue
+
+                full_row = list(row) + [""] * (ROW_WIDTH - len(row))
+                full_row[ID_COLUMN] = tx_id
+                mask = ALL_COLUMNS_MASK
+                if existing:
+                    old_hash, dirty, old_mask, *old_row = existing
+                    mask = old_mask if dirty else 0
+                    for col, (old, new) in enumerate(zip(old_row, full_row)):
+                        if normalize_cell(old) != normalize_cell(new):
+                            mask |= 1 << col
+                names = ["provider"] + COLUMNS + ["width", "row_hash", "dirty", "changed_mask", "updated_at"]
+                values = [provider] + full_row + [len(row), new_hash, 1, mask, now]
+                self.conn.execute(
+                    f"INSERT OR REPLACE INTO ledger ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                    values,
+                )
+                if existing:
+                    changed += 1
+                else:
+                    inserted += 1
+        return inserted, changed
+
+    def _select_rows(self, where="", params=()):
+        with self.lock:
+            cursor = self.conn.execute(
+                f"SELECT provider, width, row_hash, changed_mask, {', '.join(COLUMNS)} FROM ledger {where} "
+                f"ORDER BY date_serial, rowid",
+                params,
+            )
+            result = cursor.fetchall()
+        return [(provider, list(values[:width]), h, mask) for provider, width, h, mask, *values in result]
+
+    def dirty_rows(self):
+        """
+        [(provider, row, row_hash, changed_mask), ...] — рядки, які ще не перенесено в аркуш.
+        changed_columns(changed_mask) — які колонки з того часу змінились.
+        """
+        return self._select_rows("WHERE dirty = 1")
+
+    def all_rows(self):
+        return [(provider, row, h) for provider, row, h, mask in self._select_rows()]
+
+    def mark_synced(self, keys):
+        """
+        keys: [(provider, tx_id, row_hash), ...]. Хеш у умові не дає скинути прапорець,
+        якщо рядок змінився вже після того, як його вибрали для синхронізації.
+        """
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE ledger SET dirty = 0, changed_mask = 0 WHERE provider = ? AND tx_id = ? AND row_hash = ?", keys
+            )
+
+    def record_archived(self, entries):
+        """entries: [(tx_id, spreadsheet_url, tab, row_number, row_hash), ...]."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sheet_archive "
+                "(tx_id, spreadsheet_url, tab, row_number, row_hash, archived_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(*entry, now) for entry in entries],
+            )
+
+    def archived_locations(self, tx_ids) -> dict:
+        """{tx_id: (spreadsheet_url, tab, row_number, row_hash)} для заархівованих записів."""
+        tx_ids = list(tx_ids)
+        result = {}
+        with self.lock:
+            for offset in range(0, len(tx_ids), SQL_VARIABLES_CHUNK):
+                chunk = tx_ids[offset:offset + SQL_VARIABLES_CHUNK]
+                cursor = self.conn.execute(
+                    "SELECT tx_id, spreadsheet_url, tab, row_number, row_hash FROM sheet_archive "
+                    f"WHERE tx_id IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for tx_id, *location in cursor.fetchall():
+                    result[tx_id] = tuple(location)
+        return result
+
+    def mark_archived_updated(self, keys):
+        """keys: [(tx_id, row_hash), ...] — рядки, переписані у вкладці архіву."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE sheet_archive SET row_hash = ? WHERE tx_id = ?", [(h, tx_id) for tx_id, h in keys]
+            )
+
+    def forget_archived(self, tx_ids):
+        """Видаляє розташування в архіві, коли вкладки вже немає."""
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM sheet_archive WHERE tx_id = ?", [(tx_id,) for tx_id in tx_ids])
+
+    def close(self):
+        self.conn.close()
+
+
+_default_ledger = None
+_default_lock = threading.Lock()
+
+
+def get_ledger() -> Ledger:
+    global _default_ledger
+    with _default_lock:
+        if _default_ledger is None:
+            _default_ledger = Ledger()
+        return _default_ledger
+
@@ -1,5 +1,4 @@
 import time
-from datetime import datetime, timedelta
 from facturow.factura import export_fakturownia_all_to_google_sheets
 from facturow.bitfactura import export_bitfactura_invoices_to_google_sheets, export_bitfactura_all_to_google_sheets
 from etherscan.etherscan import export_erc20_to_google_sheet
@@ -7,65 +6,117 @@ from tronscan.transactions import export_trc20_transactions_troscan_to_google_sh
 from portmone.check_payment_status import export_portmone_orders_full
 from mono.mono import export_mono_transactions_to_google_sheets
 from privat.privat import privat_export
+from privat.balance_privat import run_balance_update
+from table import init_google_sheet
+from sheet_writer import SheetWriter
+from sheet_sync import sync_ledger_to_sheet
+from archive import ARCHIVE_SECTION, run_archive
+from ledger import get_ledger
+from config_manager import config_manager
+from utils import refresh_exchange_rates
+from metrics import METRICS, timed, start_metrics_server
+from scheduler import Scheduler, Job
 
+# (ключ, назва для логів, функція експорту)
+PROVIDERS = [
+    ("privat", "privat", privat_export),
+    ("mono", "mono", export_mono_transactions_to_google_sheets),
+    ("fakturownia", "Fakturownia", export_fakturownia_all_to_google_sheets),
+    ("bitfactura", "Bitfactura", export_bitfactura_all_to_google_sheets),
+    ("erc20", "ERC20", export_erc20_to_google_sheet),
+    ("trc20", "TRC20 Tronscan", export_trc20_transactions_troscan_to_google_sheets),
+    ("portmone", "Portmone", export_portmone_orders_full),
+]
 
-def generate_date_ranges(start_date, end_date, delta_days=31):
-    current_start = start_date
-    while current_start < end_date:
-        current_end = min(current_start + timedelta(days=delta_days - 1), end_date)
-        yield current_start, current_end
-        current_start = current_end + timedelta(days=1)
+DEFAULT_PROVIDER_TIMEOUT = 1800
+
+
+def run_provider(key, title, export, ledger):
+    try:
+        print(f"🚀 Запускаємо експорт {title}...")
+        with timed(f"provider.{key}"):
+            export(ledger)
+        print(f"✅ {title} експорт завершено.\n")
+    except Exception as e:
+        print(f"❌ Помилка при експорті {title}: {e}\n")
+
+
+# Розклад за замовчуванням; секція SCHEDULE у config.json перекриває ключі поштучно.
+# interval — секунди між запусками, jitter — випадкова добавка, at/tz/weekdays — як у cron,
+# "enabled": false вимикає джерело.
+DEFAULT_SCHEDULE = {
+    "privat": {"interval": 3600, "jitter": 120},
+    "mono": {"interval": 900, "jitter": 60},
+    "fakturownia": {"interval": 3600, "jitter": 120},
+    "bitfactura": {"interval": 3600, "jitter": 120},
+    "erc20": {"interval": 300, "jitter": 30},
+    "trc20": {"interval": 300, "jitter": 30},
+    "portmone": {"interval": 3600, "jitter": 120},
+    "privat_balances": {"at": ["05:00"], "tz": "Europe/Kyiv"},
+    "exchange_rates": {"interval": 3600},
+    "sheet_sync": {"interval": 300},
+    "sheet_archive": {"at": ["04:30"], "tz": "Europe/Kyiv"},
+}
+
+# Завдання цієї групи пишуть в аркуш і не виконуються одночасно
+SHEET_GROUP = "sheet"
+
+
+def sync_sheet(metrics_state: dict):
+    """Переносить зміни реєстру в аркуш і записує підсумок метрик за період."""
+    try:
+        print("📤 Синхронізуємо реєстр з Google Sheets...")
+        with timed("sync"):
+            sync_ledger_to_sheet(get_ledger(), SheetWriter(init_google_sheet()))
+    except Exception as e:
+        print(f"❌ Помилка синхронізації з Google Sheets: {e}\n")
+
+    summary = METRICS.flush(metrics_state["period_started"])
+    metrics_state["period_started"] = time.time()
+    print(f"📊 Період тривав {summary['duration']:.0f} с, підсумок записано в metrics.jsonl.")
+
+
+def build_jobs(config: dict):
+    runner_conf = config.get("RUNNER", {})
+    timeouts = runner_conf.get("timeouts", {})
+    default_timeout = runner_conf.get("default_timeout", DEFAULT_PROVIDER_TIMEOUT)
+    schedule_conf = config.get("SCHEDULE", {})
+    ledger = get_ledger()
+    metrics_state = {"period_started": time.time()}
+
+    tasks = [
+        (key, lambda key=key, title=title, export=export: run_provider(key, title, export, ledger), None)
+        for key, title, export in PROVIDERS
+    ]
+    tasks += [
+        ("privat_balances", run_balance_update, SHEET_GROUP),
+        ("exchange_rates", refresh_exchange_rates, None),
+        ("sheet_sync", lambda: sync_sheet(metrics_state), SHEET_GROUP),
+    ]
+    # Архівація переносить і видаляє рядки, тож вмикається лише явною секцією ARCHIVE
+    if ARCHIVE_SECTION in config:
+        tasks.append(("sheet_archive", run_archive, SHEET_GROUP))
+
+    jobs = []
+    for key, fn, group in tasks:
+        spec = {**DEFAULT_SCHEDULE.get(key, {}), **schedule_conf.get(key, {})}
+        if not spec.pop("enabled", True):
+            print(f"⏸️ {key}: вимкнено в SCHEDULE.")
+            continue
+        spec.setdefault("timeout", timeouts.get(key, default_timeout))
+        jobs.append(Job(key, fn, group=group, **spec))
+    return jobs
 
 
 def main_loop():
-    while True:
-        try:
-            print("🚀 Запускаємо експорт privat транзакцій...")
-            privat_export()
-            print("✅ privat експорт завершено.\n")
-        except Exception as e:
-            print(f"❌ Помилка при експорті privat: {e}\n")
-        try:
-            print("🚀 Запускаємо експорт mono транзакцій...")
-            export_mono_transactions_to_google_sheets()
-            print("✅ mono експорт завершено.\n")
-        except Exception as e:
-            print(f"❌ Помилка при експорті mono: {e}\n")
-
-        try:
-            print("🚀 Запускаємо експорт TRC20 транзакцій...")
-            export_fakturownia_all_to_google_sheets()
-            print("✅ TRC20 експорт завершено.\n")
-        except Exception as e:
-            print(f"❌ Помилка при експорті TRC20: {e}\n")
-
-        try:
-            print("🚀 Запускаємо експорт інвойсів Bitfactura...")
-            export_bitfactura_all_to_google_sheets()
-            print("✅ Експорт інвойсів завершено.\n")
-        except Exception as e:
-            print(f"❌ Помилка при експорті Bitfactura: {e}\n")
-
-        try:
-            export_erc20_to_google_sheet()
-        except Exception as e:
-            print(f"❌ Помилка при експорті ERC20: {e}")
-
-        try:
-            export_trc20_transactions_troscan_to_google_sheets()
-        except Exception as e:
-            print(f"❌ Помилка при експорті TRC20 Tronscan: {e}")
-
-        try:
-            print("🚀 Запускаємо експорт замовлень Portmone за останні 2 роки...")
-            export_portmone_orders_full()
-
-            print("✅ Експорт замовлень Portmone завершено.\n")
-        except Exception as e:
-            print(f"❌ Помилка при експорті Portmone: {e}\n")
-
-        print("⏰ Чекаємо 1 годину до наступного запуску...\n")
-        time.sleep(3600)
+    CONFIG = config_manager()
+    runner_conf = CONFIG.get("RUNNER", {})
+
+    # Prometheus-ендпоінт вмикається ключем RUNNER.metrics_port
+    if runner_conf.get("metrics_port"):
+        start_metrics_server(runner_conf["metrics_port"])
+
+    Scheduler(build_jobs(CONFIG)).run_forever()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_FILE = "metrics.jsonl"
+
+
+class CycleMetrics:
+    """
+    Лічильники і таймінги етапів за один цикл експорту.
+    Етапи: http.<хост>, sheets.read, sheets.write, rows.build.<провайдер>, provider.<ключ> тощо.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._counters = {}
+        self.last_summary = None
+
+    def observe(self, stage: str, seconds: float, count: int = 1):
+        with self._lock:
+            entry = self._timings.setdefault(stage, [0, 0.0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def add(self, counter: str, value=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    @contextmanager
+    def timer(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def flush(self, started_at: float, path=METRICS_FILE) -> dict:
+        """Дописує підсумок циклу одним рядком JSON і обнуляє лічильники."""
+        with self._lock:
+            summary = {
+                "started_at": round(started_at, 3),
+                "duration": round(time.time() - started_at, 3),
+                "timings": {
+                    stage: {"count": count, "seconds": round(total, 3), "max": round(longest, 3)}
+                    for stage, (count, total, longest) in sorted(self._timings.items())
+                },
+                "counters": dict(sorted(self._counters.items())),
+            }
+            self._timings = {}
+            self._counters = {}
+            self.last_summary = summary
+
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+        return summary
+
+
+METRICS = CycleMetrics()
+
+
+def timed(stage: str):
+    return METRICS.timer(stage)
+
+
+def count(counter: str, value=1):
+    METRICS.add(counter, value)
+
+
+def _metric_name(name: str) -> str:
+    return "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def render_prometheus(summary) -> str:
+    """Останній підсумок циклу в текстовому форматі Prometheus (значення — gauge за цикл)."""
+    if not summary:
+        return ""
+    lines = [
+        f"export_cycle_duration_seconds {summary['duration']}",
+        f"export_cycle_started_at {summary['started_at']}",
+    ]
+    for stage, entry in summary["timings"].items():
+        label = stage.replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'export_stage_seconds{{stage="{label}"}} {entry["seconds"]}')
+        lines.append(f'export_stage_calls{{stage="{label}"}} {entry["count"]}')
+        lines.append(f'export_stage_max_seconds{{stage="{label}"}} {entry["max"]}')
+    for counter, value in summary["counters"].items():
+        lines.append(f"export_{_metric_name(counter)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus(METRICS.last_summary).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    """Піднімає /metrics у фоновому потоці (один раз на процес)."""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        print(f"📈 Метрики доступні на http://{host}:{port}/metrics")
+    return _server
@@ -1,44 +1,40 @@
-import time
-import requests
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from config_manager import config_manager, CURRENCY_CODES
-from table import init_google_sheet
-from utils import datetime_to_serial_float, format_amount, get_mono_exchange_rates, convert_currency
+from ledger import get_ledger
+from rate_limiter import RateLimiter
+from http_client import http_get
+from pipeline import store_batches
+from normalize import serial_dates, amounts, directions, emit_rows
+from sync_cursor import sync_window, save_cursor, cursor_overlap
 
-
-
-def convert_to_serial_date(dt: datetime) -> float:
-    epoch = datetime(1899, 12, 30)
-    delta = dt - epoch
-    return delta.days + (delta.seconds + delta.microseconds / 1e6) / 86400
+# Mono дозволяє один запит на 60 секунд на токен (окремо для statement і client-info)
+MONO_RATE_INTERVAL = 61
+STATEMENT_LIMITER = RateLimiter(MONO_RATE_INTERVAL)
+CLIENT_INFO_LIMITER = RateLimiter(MONO_RATE_INTERVAL)
+# Утримання (hold) списуються остаточно за кілька днів — стільки й перечитуємо після курсора
+HOLD_OVERLAP = timedelta(days=3)
 
 
 def fetch_monobank_transactions(account_id, api_key, from_time, to_time, max_retries=5):
     headers = {"X-Token": api_key}
     url = f"https://api.monobank.ua/personal/statement/{account_id}/{from_time}/{to_time}"
-    retries = 0
-    wait_time = 2
-
-    while retries <= max_retries:
-        time.sleep(66)
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 429:
-            print(f"⚠️ Ліміт запитів Mono API перевищено. Очікуємо {wait_time} секунд...")
-            time.sleep(wait_time)
-            retries += 1
-            wait_time *= 2
-        else:
-            raise Exception(f"❌ Помилка API Mono: {response.status_code} - {response.text}")
-    raise Exception("❌ Перевищено кількість повторів через помилку 429.")
+    # Повтори при 429/5xx робить http_get, чекаючи через ліміт токена
+    response = http_get(
+        url, headers=headers, max_attempts=max_retries + 1,
+        limiter=STATEMENT_LIMITER, limiter_key=api_key,
+    )
+    if response.status_code == 200:
+        return response.json()
+    if response.status_code == 429:
+        raise Exception("❌ Перевищено кількість повторів через помилку 429.")
+    raise Exception(f"❌ Помилка API Mono: {response.status_code} - {response.text}")
 
 
 def get_monobank_accounts(api_key):
     headers = {"X-Token": api_key}
     url = "https://api.monobank.ua/personal/client-info"
-    time.sleep(1)
-    response = requests.get(url, headers=headers)
+    response = http_get(url, headers=headers, limiter=CLIENT_INFO_LIMITER, limiter_key=api_key)
     if response.status_code == 200:
         data = response.json()
         name = data.get("name", "unknown")
@@ -55,124 +51,107 @@ def get_monobank_accounts(api_key):
 
 
 
-def export_mono_transactions_to_google_sheets():
-    CONFIG = config_manager()
-    mono_entries = CONFIG.get("MONO", [])
-    if not mono_entries:
-        print("⚠️ MONO гаманці у конфігу не знайдено.")
+def iter_monobank_transactions(account_id, api_key, from_dt: datetime, to_dt: datetime,
+                               chunk_days: int = 31, strict: bool = False):
+    """
+    Генератор транзакцій рахунку: виписка читається 31-денними шматками в міру споживання.
+    strict=True — помилка кидає виняток замість тихої зупинки (для backfill).
+    """
+    chunk_start = from_dt
+
+    while chunk_start < to_dt:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days), to_dt)
+        from_time = int(chunk_start.timestamp())
+        to_time = int(chunk_end.timestamp())
+
+        print(f"🔄 Транзакції з {chunk_start.date()} по {chunk_end.date()}")
+
+        try:
+            txs = fetch_monobank_transactions(account_id, api_key, from_time, to_time)
+        except Exception as e:
+            print(f"❌ Помилка при отриманні транзакцій: {e}")
+            if strict:
+                raise
+            return
+        if not isinstance(txs, list):
+            print("❌ Очікував список транзакцій.")
+            if strict:
+                raise Exception("Mono API: очікував список транзакцій")
+            return
+        yield from txs
+
+        chunk_start = chunk_end + timedelta(seconds=1)
+
+
+def build_mono_rows(txs, client_name: str, iban: str, account_info: dict):
+    """Пачка транзакцій рахунку -> рядки аркуша (див. normalize). Записи без id пропускаються."""
+    txs = [tx for tx in txs if str(tx.get("id", ""))]
+    account_currency = account_info.get("account_currency")
+    operation_currencies = [tx.get("currencyCode", account_currency) for tx in txs]
+
+    # Суми Mono приходять у копійках
+    return emit_rows(len(txs), {
+        0: serial_dates([tx.get("time", 0) for tx in txs]),
+        1: "monobank",
+        2: client_name,
+        3: iban,
+        4: directions([tx.get("amount", 0) < 0 for tx in txs]),
+        5: amounts([tx.get("amount", 0) for tx in txs], decimals=2),
+        6: amounts([tx.get("operationAmount", 0) for tx in txs], decimals=2),
+        7: [CURRENCY_CODES.get(currency, currency) for currency in operation_currencies],
+        8: amounts([tx.get("commissionRate", 0) for tx in txs], decimals=2),  # комісія
+        9: amounts([tx.get("balance", 0) for tx in txs], decimals=2),
+        10: [tx.get("comment", "") for tx in txs],
+        11: [tx.get("counterName", "") for tx in txs],
+        12: [tx.get("counterEdrpou", 0) if tx.get("counterEdrpou") else "" for tx in txs],
+        13: [tx.get("counterIban", "") for tx in txs],
+        14: [tx.get("mcc", "") for tx in txs],
+        15: [tx.get("description", "") for tx in txs],
+        16: [str(tx.get("id", "")) for tx in txs],
+    })
+
+
+def export_mono_token(ledger, item):
+    api_key = item.get("api_token")
+    if not api_key:
+        print("⚠️ Відсутній api_token у MONO конфігу.")
         return
 
-    worksheet = init_google_sheet()
+    days = item.get("days", 5)
+
+    client_name, accounts = get_monobank_accounts(api_key)
+    if not accounts:
+        print("❌ Не знайдено рахунків для токена.")
+        return
 
-    for item in mono_entries:
-        api_key = item.get("api_token")
-        if not api_key:
-            print("⚠️ Відсутній api_token у MONO конфігу.")
+    for account_id, account_info in accounts.items():
+        iban = account_info.get("iban", f"Mono-{account_id}")
+        # Курсор на рахунок: від останнього успішного запуску, days — лише для першого
+        from_dt, to_dt = sync_window("mono", account_id, days, cursor_overlap(item, HOLD_OVERLAP))
+        print(f"\n📥 Рахунок: {iban}, період: {from_dt:%Y-%m-%d %H:%M} - {to_dt:%Y-%m-%d %H:%M}")
+
+        try:
+            transactions = iter_monobank_transactions(account_id, api_key, from_dt, to_dt, strict=True)
+            store_batches(ledger, "mono", transactions,
+                          lambda batch: build_mono_rows(batch, client_name, iban, account_info))
+        except Exception as e:
+            print(f"❌ Виписку {iban} не отримано повністю, курсор не зсуваємо: {e}")
             continue
 
-        days = item.get("days", 5)
-        to_dt = datetime.now()
-        from_dt = to_dt - timedelta(days=days)
+        save_cursor("mono", account_id, to_dt)
 
-        client_name, accounts = get_monobank_accounts(api_key)
-        if not accounts:
-            print("❌ Не знайдено рахунків для токена.")
-            continue
 
-        for account_id, account_info in accounts.items():
-            iban = account_info.get("iban", f"Mono-{account_id}")
-            print(f"\n📥 Рахунок: {iban}, період: {from_dt.date()} - {to_dt.date()}")
-
-            all_transactions = []
-            chunk_start = from_dt
-            chunk_days = 31
-
-            while chunk_start < to_dt:
-                chunk_end = min(chunk_start + timedelta(days=chunk_days), to_dt)
-                from_time = int(chunk_start.timestamp())
-                to_time = int(chunk_end.timestamp())
-
-                print(f"🔄 Транзакції з {chunk_start.date()} по {chunk_end.date()}")
-
-                try:
-                    txs = fetch_monobank_transactions(account_id, api_key, from_time, to_time)
-                    if not isinstance(txs, list):
-                        print("❌ Очікував список транзакцій.")
-                        break
-                    all_transactions.extend(txs)
-                except Exception as e:
-                    print(f"❌ Помилка при отриманні транзакцій: {e}")
-                    break
-
-                chunk_start = chunk_end + timedelta(seconds=1)
-
-            existing_rows = worksheet.get_all_values()
-            header_offset = 1
-            existing_tx_by_id = {}
-            for i, row in enumerate(existing_rows[header_offset:], start=header_offset + 1):
-                full_row = row + [""] * (25 - len(row))
-                tx_id = full_row[16]
-                if tx_id:
-                    existing_tx_by_id[str(tx_id)] = {"row_number": i, "row_data": full_row}
-
-            rows_to_update = []
-            rows_to_append = []
-
-            for tx in all_transactions:
-                tx_id = str(tx.get("id", ""))
-                if not tx_id:
-                    continue
-
-                dt = datetime.fromtimestamp(tx.get("time", 0))
-                timestamp = convert_to_serial_date(dt)
-
-                balance = abs(format_amount(tx.get("balance", 0)) / 100)
-                type_op = "debit" if tx.get("amount", 0) < 0 else "credit"
-
-                account_currency = account_info.get("account_currency")
-                operation_currency = tx.get("currencyCode", account_currency)
-                
-                amount_value = abs(tx.get("amount", 0)) / 100
-                operation_amount_value = abs(tx.get("operationAmount", 0)) / 100
-
-                
-
-                new_row = [""] * 25
-                new_row[0] = timestamp
-                new_row[1] = "monobank"
-                new_row[2] = client_name
-                new_row[3] = iban
-                new_row[4] = type_op
-                new_row[5] = amount_value
-                new_row[6] = operation_amount_value  
-                new_row[7] = CURRENCY_CODES.get(operation_currency, operation_currency)
-                new_row[8] = abs(format_amount(tx.get("commissionRate", 0)) / 100)  # комісія
-                new_row[9] = balance
-                new_row[10] = tx.get("comment", "")
-                new_row[11] = tx.get("counterName", "")
-                new_row[12] = tx.get("counterEdrpou", 0) if tx.get("counterEdrpou") else ""
-                new_row[13] = tx.get("counterIban", "")
-                new_row[14] = tx.get("mcc", "")
-                new_row[15] = tx.get("description", "")
-                new_row[16] = tx_id
-
-                if tx_id in existing_tx_by_id:
-                    existing = existing_tx_by_id[tx_id]
-                    if new_row != existing["row_data"]:
-                        rows_to_update.append((existing["row_number"], new_row))
-                else:
-                    rows_to_append.append(new_row)
-
-            if rows_to_update:
-                batch_data = [{"range": f"A{row_number}:Y{row_number}", "values": [row_data]}
-                              for row_number, row_data in rows_to_update]
-                worksheet.batch_update(batch_data)
-                print(f"🔁 Оновлено {len(rows_to_update)} транзакцій.")
-
-            if rows_to_append:
-                start_row = len(existing_rows) + 1
-                worksheet.update(f"A{start_row}:Y{start_row + len(rows_to_append) - 1}", rows_to_append)
-                print(f"➕ Додано {len(rows_to_append)} нових транзакцій.")
-            else:
-                print("✅ Нових транзакцій немає.")
+def export_mono_transactions_to_google_sheets(ledger=None):
+    CONFIG = config_manager()
+    mono_entries = CONFIG.get("MONO", [])
+    if not mono_entries:
+        print("⚠️ MONO гаманці у конфігу не знайдено.")
+        return
+
+    if ledger is None:
+        ledger = get_ledger()
 
+    # Токени обробляються паралельно — ліміт Mono діє окремо для кожного токена
+    with ThreadPoolExecutor(max_workers=len(mono_entries), thread_name_prefix="mono") as executor:
+        for future in [executor.submit(export_mono_token, ledger, item) for item in mono_entries]:
+            future.result()
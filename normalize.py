@@ -0,0 +1,179 @@
+"""
+Спільна нормалізація записів провайдерів пачками: колонки (дати, суми,
+debit/credit) рахуються для всієї пачки одразу, а рядки аркуша
+збираються одним проходом. Якщо встановлено NumPy, арифметика
+векторизована; без нього — той самий результат на чистому Python.
+"""
+import time
+from datetime import datetime, timezone
+from itertools import repeat
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ROW_WIDTH = 25
+SECONDS_PER_DAY = 86400
+# 1970-01-01 у форматі дат Google Sheets (дні від 1899-12-30)
+UNIX_EPOCH_SERIAL = 25569
+SHEETS_EPOCH = datetime(1899, 12, 30)
+
+# Зсув локального часу однаковий у межах 15 хвилин (переходи DST — на межі години)
+_OFFSET_BUCKET = 900
+
+
+def _local_offsets(timestamps):
+    """Зсув локального часового поясу для кожної мітки; localtime() — раз на 15-хвилинний кошик."""
+    cache = {}
+    offsets = []
+    for ts in timestamps:
+        bucket = int(ts) // _OFFSET_BUCKET
+        offset = cache.get(bucket)
+        if offset is None:
+            offset = cache[bucket] = time.localtime(bucket * _OFFSET_BUCKET).tm_gmtoff
+        offsets.append(offset)
+    return offsets
+
+
+def serial_dates(timestamps):
+    """
+    Unix-мітки (секунди) -> дати Google Sheets за локальним часом,
+    як datetime.fromtimestamp(ts) - 1899-12-30. Некоректні мітки -> "".
+    """
+    valid = []
+    positions = []
+    result = [""] * len(timestamps)
+    for i, ts in enumerate(timestamps):
+        try:
+            valid.append(float(ts))
+            positions.append(i)
+        except (TypeError, ValueError):
+            continue
+    if not valid:
+        return result
+
+    offsets = _local_offsets(valid)
+    if np is not None:
+        seconds = np.asarray(valid, dtype=np.float64) + np.asarray(offsets, dtype=np.float64) \
+            + UNIX_EPOCH_SERIAL * SECONDS_PER_DAY
+        days, rest = np.divmod(seconds, SECONDS_PER_DAY)
+        values = (days + rest / SECONDS_PER_DAY).tolist()
+    else:
+        values = []
+        for ts, offset in zip(valid, offsets):
+            days, rest = divmod(ts + offset + UNIX_EPOCH_SERIAL * SECONDS_PER_DAY, SECONDS_PER_DAY)
+            values.append(days + rest / SECONDS_PER_DAY)
+
+    for i, value in zip(positions, values):
+        result[i] = value
+    return result
+
+
+def parse_serial_dates(values, fmt: str):
+    """
+    Рядки дат у форматі fmt -> дати Google Sheets. Однакові рядки розбираються один раз;
+    нерозібрані повертаються як є (обрізаними), як і раніше в експортерах.
+    """
+    cache = {}
+    result = []
+    for value in values:
+        serial = cache.get(value)
+        if serial is None:
+            try:
+                dt = datetime.strptime(value, fmt)
+                serial = (dt - SHEETS_EPOCH).total_seconds() / SECONDS_PER_DAY
+            except (TypeError, ValueError):
+                serial = value.strip() if isinstance(value, str) else value
+            cache[value] = serial
+        result.append(serial)
+    return result
+
+
+def iso_serial_dates(values):
+    """ISO-дати з часовим поясом (2025-07-01T11:28:13.000+02:00) -> дати Google Sheets в UTC."""
+    result = []
+    for value in values:
+        try:
+            text = value
+            if text[-3] == ":":
+                text = text[:-3] + text[-2:]
+            dt = datetime.fromisoformat(text)
+            if dt.tzinfo is not None:
+                dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+            result.append((dt - SHEETS_EPOCH).total_seconds() / SECONDS_PER_DAY)
+        except Exception as e:
+            print(f"⚠️ Помилка при конвертації дати {value}: {e}")
+            result.append(value)
+    return result
+
+
+def _to_float(value, comma_decimal=False):
+    try:
+        if comma_decimal and isinstance(value, str):
+            value = value.replace(",", ".")
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def amounts(values, decimals=0, ndigits=2, absolute=True, comma_decimal=False, default=0.0):
+    """
+    Суми пачкою: value / 10**decimals, округлення до ndigits, за потреби модуль.
+    decimals — число або послідовність (для токенів з різною точністю).
+    Значення, що не є числом, -> default.
+    """
+    parsed = [_to_float(value, comma_decimal) for value in values]
+    if isinstance(decimals, int):
+        decimals = repeat(decimals, len(parsed))
+    scales = []
+    for value in decimals:
+        try:
+            scales.append(10.0 ** int(value))
+        except (TypeError, ValueError):
+            scales.append(None)
+
+    if np is not None:
+        bad = np.asarray([v is None or s is None for v, s in zip(parsed, scales)], dtype=bool)
+        numbers = np.asarray([0.0 if v is None else v for v in parsed], dtype=np.float64)
+        divisors = np.asarray([1.0 if s is None else s for s in scales], dtype=np.float64)
+        # Округлення — Python round(): np.round масштабує і дає інший результат
+        # на половинках ("0.015" -> 0.02 замість 0.01), а хеші рядків мають не залежати від NumPy
+        quotients = (numbers / divisors).tolist()
+        result = []
+        for value, is_bad in zip(quotients, bad.tolist()):
+            if is_bad:
+                result.append(default)
+                continue
+            amount = round(value, ndigits)
+            result.append(abs(amount) if absolute else amount)
+        return result
+
+    result = []
+    for value, scale in zip(parsed, scales):
+        if value is None or scale is None:
+            result.append(default)
+            continue
+        amount = round(value / scale, ndigits)
+        result.append(abs(amount) if absolute else amount)
+    return result
+
+
+def directions(flags, when_true="debit", when_false="credit"):
+    """Прапорці -> 'debit'/'credit'."""
+    return [when_true if flag else when_false for flag in flags]
+
+
+def emit_rows(count: int, columns: dict, width: int = ROW_WIDTH):
+    """
+    Збирає рядки аркуша з колонок одним проходом.
+    columns: {індекс колонки: послідовність значень або одне значення для всіх рядків}.
+    """
+    series = []
+    for index in range(width):
+        values = columns.get(index, "")
+        if isinstance(values, (list, tuple)):
+            series.append(values)
+        else:
+            series.append(repeat(values, count))
+    return [list(row) for row in zip(*series)]
@@ -0,0 +1,47 @@
+import time
+from itertools import islice
+from metrics import METRICS, timed, count
+
+FLUSH_EVERY = 500
+
+
+def batched(iterable, size: int):
+    """Ділить потік на списки по size елементів, не читаючи його наперед."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def store_batches(ledger, provider: str, records, build_rows, batch_size: int = FLUSH_EVERY):
+    """
+    Потоковий конвеєр: записи провайдера -> рядки -> реєстр пачками по batch_size.
+    build_rows отримує список записів і повертає список рядків (див. normalize),
+    тож нормалізація йде цілою пачкою, без накладних витрат на кожен рядок.
+    В пам'яті тримається лише одна пачка, а запис починається з першої ж пачки.
+    """
+    inserted = changed = 0
+    build_seconds = 0.0
+    built = 0
+
+    for batch in batched(records, batch_size):
+        started = time.perf_counter()
+        rows = build_rows(batch)
+        build_seconds += time.perf_counter() - started
+        built += len(batch)
+        if not rows:
+            continue
+        with timed(f"ledger.upsert.{provider}"):
+            batch_inserted, batch_changed = ledger.upsert_rows(provider, rows)
+        inserted += batch_inserted
+        changed += batch_changed
+
+    METRICS.observe(f"rows.build.{provider}", build_seconds, built)
+    count(f"records.{provider}", built)
+    count(f"rows_inserted.{provider}", inserted)
+    count(f"rows_changed.{provider}", changed)
+    print(f"💾 Реєстр ({provider}): {inserted} нових, {changed} змінених записів.")
+    return inserted, changed
+
@@ -1,24 +1,16 @@
 import requests
-import time
 import json
-from datetime import datetime, timedelta
-from table import init_google_sheet
+from datetime import timedelta
+from ledger import get_ledger
 from config_manager import config_manager
+from http_client import http_post
+from pipeline import store_batches
+from normalize import parse_serial_dates, amounts, emit_rows
+from sync_cursor import sync_window, save_cursor, cursor_overlap
 
 
-def format_amount(value):
-    try:
-        return round(float(value), 2)
-    except (ValueError, TypeError):
-        return 0.00
-
-
-def datetime_to_serial_float(dt: datetime) -> float:
-    epoch = datetime(1899, 12, 30)
-    return (dt - epoch).total_seconds() / 86400
-
-
-def get_all_payment_statuses(start_date: str, end_date: str):
+def get_all_payment_statuses(start_date: str, end_date: str, strict: bool = False):
+    """Замовлення Portmone за період; strict=True — помилки кидаються далі (для backfill)."""
     CONFIG = config_manager()
     portmone_config = CONFIG.get("PORTMONE", [{}])[0]
 
@@ -29,6 +21,8 @@ def get_all_payment_statuses(start_date: str, end_date: str):
 
     if not (PAYEE_ID and LOGIN and PASSWORD):
         print("❌ В конфігурації не задані дані Portmone (login, password, payee_id)")
+        if strict:
+            raise Exception("Portmone: не задані login, password, payee_id")
         return []
 
     payload = {
@@ -48,7 +42,7 @@ def get_all_payment_statuses(start_date: str, end_date: str):
     headers = {"Content-Type": "application/json"}
 
     try:
-        response = requests.post(PORTMONE_URL, json=payload, headers=headers)
+        response = http_post(PORTMONE_URL, json=payload, headers=headers)
         response.raise_for_status()
         data = response.json()
 
@@ -59,6 +53,8 @@ def get_all_payment_statuses(start_date: str, end_date: str):
                 return data["result"]
             else:
                 print("❗️ Неочікуваний формат 'result' у відповіді Portmone")
+                if strict:
+                    raise Exception("Portmone: неочікуваний формат 'result'")
                 return []
         elif isinstance(data, list):
             return data
@@ -67,80 +63,44 @@ def get_all_payment_statuses(start_date: str, end_date: str):
 
     except requests.exceptions.RequestException as e:
         print(f"❌ Помилка запиту Portmone: {e}")
+        if strict:
+            raise
         return []
 
 
-def write_orders_to_sheet(worksheet, orders: list):
-    try:
-        existing_rows = worksheet.get_all_values()
-    except Exception:
-        print("⚠️ Зачекай 60 секунд (Rate Limit)...")
-        time.sleep(60)
-        existing_rows = worksheet.get_all_values()
-
-    header_offset = 1
-    existing_orders_by_id = {}
-    for i, row in enumerate(existing_rows[header_offset:], start=header_offset + 1):
-        if len(row) > 16 and row[16]:
-            existing_orders_by_id[row[16]] = {"row_number": i, "row_data": row + [""] * (25 - len(row))}
-
-    rows_to_update = []
-    rows_to_append = []
-
-    for order in orders:
-        new_row = [""] * 25
-        date_str = order.get("pay_date", "")
-        try:
-            dt = datetime.strptime(date_str, "%d.%m.%Y %H:%M:%S")
-            new_row[0] = datetime_to_serial_float(dt)
-        except Exception:
-            new_row[0] = date_str
-        new_row[1] = "portmone"
-        new_row[2] = order.get("payee_name", "")
-        status = order.get("status", "")
-        new_row[4] = "debit" if status == "PAYED" else "invoice" if status == "CREATED" else status
-        amount = abs(format_amount(order.get("billAmount")))
-        new_row[5] = amount
-        new_row[6] = amount
-        new_row[7] = "UAH"
-        new_row[8] = abs(format_amount(order.get("payee_commission")))
-        new_row[10] = order.get("description", "")
-        new_row[11] = f'{order.get("cardBankName", "")}, {order.get("cardTypeName", "")}, {order.get("gateType", "")}'
-        new_row[13] = order.get("cardMask", "")
-        new_row[15] = f'{order.get("errorCode", "")}, {order.get("errorMessage", "")}'
-        new_row[16] = order.get("shopBillId", "")
-
-        shop_bill_id = new_row[16]
-
-        if shop_bill_id in existing_orders_by_id:
-            existing = existing_orders_by_id[shop_bill_id]
-            if new_row != existing["row_data"]:
-                rows_to_update.append((existing["row_number"], new_row))
-        else:
-            rows_to_append.append(new_row)
-
-    if rows_to_update:
-        batch_data = [
-            {"range": f"A{row_number}:Y{row_number}", "values": [row_data]}
-            for row_number, row_data in rows_to_update
-        ]
-        worksheet.batch_update(batch_data)
-        print(f"🔁 Оновлено {len(rows_to_update)} рядків.")
-
-    if rows_to_append:
-        start_row = len(existing_rows) + 1
-        worksheet.update(
-            f"A{start_row}:Y{start_row + len(rows_to_append) - 1}",
-            rows_to_append,
-            value_input_option="USER_ENTERED"
-        )
-        print(f"➕ Додано {len(rows_to_append)} нових транзакцій з рядка {start_row}.")
-    else:
-        print("✅ Нових транзакцій для додавання немає.")
-
-
-def export_portmone_orders_full():
-    worksheet = init_google_sheet()
+def order_type(status: str) -> str:
+    return "debit" if status == "PAYED" else "invoice" if status == "CREATED" else status
+
+
+def build_order_rows(orders):
+    """Пачка замовлень -> рядки аркуша (див. normalize)."""
+    amount_values = amounts([order.get("billAmount") for order in orders])
+
+    return emit_rows(len(orders), {
+        0: parse_serial_dates([order.get("pay_date", "") for order in orders], "%d.%m.%Y %H:%M:%S"),
+        1: "portmone",
+        2: [order.get("payee_name", "") for order in orders],
+        4: [order_type(order.get("status", "")) for order in orders],
+        5: amount_values,
+        6: amount_values,
+        7: "UAH",
+        8: amounts([order.get("payee_commission") for order in orders]),
+        10: [order.get("description", "") for order in orders],
+        11: [f'{order.get("cardBankName", "")}, {order.get("cardTypeName", "")}, {order.get("gateType", "")}'
+             for order in orders],
+        13: [order.get("cardMask", "") for order in orders],
+        15: [f'{order.get("errorCode", "")}, {order.get("errorMessage", "")}' for order in orders],
+        16: [order.get("shopBillId", "") for order in orders],
+    })
+
+
+def store_orders(ledger, orders):
+    return store_batches(ledger, "portmone", orders, build_order_rows)
+
+
+def export_portmone_orders_full(ledger=None):
+    if ledger is None:
+        ledger = get_ledger()
 
     CONFIG = config_manager()
     portmone_config = CONFIG.get("PORTMONE", [{}])[0]
@@ -153,8 +113,10 @@ def export_portmone_orders_full():
         print(f"⚠️ Невірне значення days у конфігурації: {days}, використовую 5 днів")
         days = 5
 
-    end = datetime.now()
-    start = end - timedelta(days=days)
+    # Від курсора попереднього запуску; days — для першого і як перекриття:
+    # замовлення за останні days днів ще переходять з CREATED в PAYED, тож перечитуємо їх статуси
+    account = str(portmone_config.get("payee_id", ""))
+    start, end = sync_window("portmone", account, days, cursor_overlap(portmone_config, timedelta(days=days)))
 
     max_days = 30
     delta = timedelta(days=max_days)
@@ -167,12 +129,17 @@ def export_portmone_orders_full():
 
         print(f"🔄 Обробка періоду {start_str} - {end_str}")
 
-        orders = get_all_payment_statuses(start_str, end_str)
+        try:
+            orders = get_all_payment_statuses(start_str, end_str, strict=True)
+        except Exception as e:
+            print(f"❌ Період {start_str} - {end_str} не отримано, курсор не зсуваємо: {e}")
+            return
         if isinstance(orders, list):
-            write_orders_to_sheet(worksheet, orders)
+            store_orders(ledger, orders)
         else:
             print(f"❌ Неочікуваний формат замовлень за період {start_str} - {end_str}")
 
         current_start = current_end + timedelta(days=1)
 
+    save_cursor("portmone", account, end)
     print("✅ Експорт завершено.")
@@ -1,12 +1,13 @@
 import time
-import requests
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from datetime import datetime, timedelta
-from pytz import timezone
+from zoneinfo import ZoneInfo
 from table import init_google_sheet
 from config_manager import config_manager
+from http_client import http_get
+from sheet_writer import SheetWriter
 
 BASE_URL_BALANCES = "https://acp.privatbank.ua/api/statements/balance/final"
 
@@ -21,7 +22,7 @@ def fetch_balances(api_token: str) -> list:
     all_balances = []
 
     while True:
-        response = requests.get(BASE_URL_BALANCES, headers=headers, params=params)
+        response = http_get(BASE_URL_BALANCES, headers=headers, params=params)
         if response.status_code != 200:
             print("❌ Помилка запиту balance:", response.status_code)
             print(response.text)
@@ -52,7 +53,7 @@ def convert_to_serial_date(dt: datetime) -> float:
     return delta.days + (delta.seconds + delta.microseconds / 1e6) / 86400
 
 
-def append_balance_rows_to_sheet(worksheet, balances: list, current_dt: datetime):
+def append_balance_rows_to_sheet(writer, balances: list, current_dt: datetime):
     current_serial = convert_to_serial_date(current_dt)
     new_rows = []
 
@@ -73,7 +74,8 @@ def append_balance_rows_to_sheet(worksheet, balances: list, current_dt: datetime
         new_rows.append(row)
 
     if new_rows:
-        worksheet.append_rows(new_rows, value_input_option="USER_ENTERED")
+        # Через SheetWriter: номери рядків узгоджені з індексом, який використовує синхронізація
+        writer.append(new_rows, value_input_option="USER_ENTERED")
         print(f"➕ Додано {len(new_rows)} рядків типу 'balance'")
     else:
         print("⚠️ Немає нових балансів для додавання.")
@@ -86,20 +88,27 @@ def run_balance_update():
         print("❌ У конфігурації немає токенів PRIVAT.")
         return
 
-    worksheet = init_google_sheet()
-    current_dt = datetime.now(timezone("Europe/Kyiv"))
+    writer = SheetWriter(init_google_sheet())
+    current_dt = datetime.now(ZoneInfo("Europe/Kyiv"))
 
-    for entry in tokens:
-        api_token = entry.get("api_token")
-        if not api_token:
-            continue
+    # Баланси всіх токенів записуються одним пакетом; збій одного токена не скасовує решту
+    with writer.buffered():
+        for entry in tokens:
+            api_token = entry.get("api_token")
+            if not api_token:
+                continue
 
-        balances = fetch_balances(api_token)
-        append_balance_rows_to_sheet(worksheet, balances, current_dt)
+            try:
+                balances = list(fetch_balances(api_token))
+            except Exception as e:
+                print(f"❌ Не вдалося отримати баланси: {e}")
+                continue
+            append_balance_rows_to_sheet(writer, balances, current_dt)
 
 
 def wait_until_5am_kyiv():
-    kyiv = timezone("Europe/Kyiv")
+    """Окремий процес лише для балансів; у main.py вони вже входять у розклад (privat_balances)."""
+    kyiv = ZoneInfo("Europe/Kyiv")
     while True:
         now = datetime.now(kyiv)
         next_run = now.replace(hour=5, minute=0, second=0, microsecond=0)
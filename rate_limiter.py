@@ -0,0 +1,34 @@
+import time
+import threading
+from metrics import timed
+
+
+class RateLimiter:
+    """
+    Обмежувач частоти запитів: не більше одного виклику за `interval` секунд
+    для кожного ключа (наприклад, токена). Різні ключі не блокують один одного.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def wait(self, key):
+        """Чекає рівно стільки, скільки потрібно до наступного дозволеного виклику."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(key, now))
+            self._next_allowed[key] = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            print(f"⏳ Ліміт запитів: чекаємо {delay:.0f} с...")
+            with timed("rate_limit.wait"):
+                time.sleep(delay)
+
+    def penalize(self, key, seconds: float):
+        """Відсуває наступний виклик для ключа (наприклад, після відповіді 429)."""
+        with self._lock:
+            now = time.monotonic()
+            self._next_allowed[key] = max(self._next_allowed.get(key, now), now + seconds)
@@ -0,0 +1,157 @@
+import time
+import random
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import requests
+from metrics import timed, count
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_ATTEMPTS = 5
+BASE_DELAY = 2
+MAX_DELAY = 120
+MAX_TOTAL_DELAY = 600
+
+# Ліміти Google Sheets API на користувача: 60 запитів читання і 60 запису на хвилину
+SHEETS_READS_PER_MINUTE = 60
+SHEETS_WRITES_PER_MINUTE = 60
+
+
+def retry_after_seconds(headers):
+    """Значення Retry-After у секундах (число або HTTP-дата), або None."""
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after=None) -> float:
+    """Експоненційна затримка з jitter; Retry-After від сервера має пріоритет."""
+    if retry_after is not None:
+        return min(MAX_DELAY, retry_after) + random.uniform(0, 1)
+    delay = min(MAX_DELAY, BASE_DELAY * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
+def _should_retry(response) -> bool:
+    return response is not None and response.status_code in RETRY_STATUSES
+
+
+def request_with_retry(send, max_attempts=MAX_ATTEMPTS, max_total_delay=MAX_TOTAL_DELAY,
+                       limiter=None, limiter_key=None):
+    """
+    Виконує HTTP-запит send() і повторює його при 429/5xx та мережевих помилках.
+    Якщо передано limiter, перед кожною спробою чекаємо його дозволу,
+    а затримку після відмови переносимо в limiter замість sleep.
+    Повертає останню відповідь (навіть невдалу) або кидає мережеву помилку.
+    """
+    waited = 0.0
+    response = None
+    error = None
+
+    for attempt in range(max_attempts):
+        if limiter is not None:
+            limiter.wait(limiter_key)
+        try:
+            response = send()
+            error = None
+        except (requests.ConnectionError, requests.Timeout) as e:
+            response = None
+            error = e
+
+        if error is None and not _should_retry(response):
+            return response
+        if attempt == max_attempts - 1:
+            break
+
+        headers = response.headers if response is not None else None
+        delay = backoff_delay(attempt, retry_after_seconds(headers))
+        if waited + delay > max_total_delay:
+            break
+
+        reason = response.status_code if response is not None else error
+        print(f"⚠️ Тимчасова помилка ({reason}), повтор через {delay:.0f} с...")
+        count("http_retries")
+        if limiter is not None:
+            limiter.penalize(limiter_key, delay)
+        else:
+            time.sleep(delay)
+        waited += delay
+
+    if error is not None:
+        raise error
+    return response
+
+
+def call_with_retry(fn, *args, max_attempts=MAX_ATTEMPTS, max_total_delay=MAX_TOTAL_DELAY, **kwargs):
+    """
+    Для клієнтів, що кидають винятки з атрибутом response (наприклад, gspread.APIError):
+    повторює виклик при 429/5xx та мережевих помилках, решту помилок прокидає далі.
+    """
+    waited = 0.0
+    for attempt in range(max_attempts):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            response = getattr(e, "response", None)
+            network_error = isinstance(e, (requests.ConnectionError, requests.Timeout))
+            if not (network_error or _should_retry(response)) or attempt == max_attempts - 1:
+                raise
+
+            delay = backoff_delay(attempt, retry_after_seconds(getattr(response, "headers", None)))
+            if waited + delay > max_total_delay:
+                raise
+            print(f"⚠️ Тимчасова помилка Google Sheets, повтор через {delay:.0f} с...")
+            count("sheets_retries")
+            time.sleep(delay)
+            waited += delay
+
+
+class SheetsQuota:
+    """Ковзне вікно в одну хвилину: чекаємо лише тоді, коли ліміт справді вичерпано."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= 60:
+                    self._calls.popleft()
+                if len(self._calls) < self.per_minute:
+                    self._calls.append(now)
+                    return
+                delay = 60 - (now - self._calls[0])
+            print(f"⏳ Квота Google Sheets вичерпана, чекаємо {delay:.0f} с...")
+            with timed("sheets.quota_wait"):
+                time.sleep(delay)
+
+
+SHEETS_READ_QUOTA = SheetsQuota(SHEETS_READS_PER_MINUTE)
+SHEETS_WRITE_QUOTA = SheetsQuota(SHEETS_WRITES_PER_MINUTE)
+
+
+def sheets_read(fn, *args, **kwargs):
+    SHEETS_READ_QUOTA.acquire()
+    count("sheets_reads")
+    with timed("sheets.read"):
+        return call_with_retry(fn, *args, **kwargs)
+
+
+def sheets_write(fn, *args, **kwargs):
+    SHEETS_WRITE_QUOTA.acquire()
+    count("sheets_writes")
+    with timed("sheets.write"):
+        return call_with_retry(fn, *args, **kwargs)
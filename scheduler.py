@@ -0,0 +1,150 @@
+import time
+import random
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_JOB_TIMEOUT = 1800
+MAX_IDLE_SLEEP = 5
+# Як часто перевіряти, чи звільнилась група, на яку чекає завдання
+GROUP_WAIT_POLL = 1
+
+
+def parse_at(value: str):
+    """'05:00' -> (5, 0)."""
+    hour, minute = value.split(":")
+    return int(hour), int(minute)
+
+
+def next_daily_run(at_times, tz: str, after: float, weekdays=None) -> float:
+    """
+    Найближчий момент після after (epoch) для розкладу на кшталт cron:
+    години at_times ('HH:MM') у часовому поясі tz, опційно лише в дні weekdays (0 — понеділок).
+    """
+    zone = ZoneInfo(tz)
+    now = datetime.fromtimestamp(after, zone)
+    times = sorted(parse_at(value) for value in at_times)
+    for day in range(8):
+        date = (now + timedelta(days=day)).date()
+        if weekdays is not None and date.weekday() not in weekdays:
+            continue
+        for hour, minute in times:
+            candidate = datetime(date.year, date.month, date.day, hour, minute, tzinfo=zone)
+            if candidate.timestamp() > after:
+                return candidate.timestamp()
+    raise ValueError(f"Розклад {at_times} / {weekdays} не має жодного запуску")
+
+
+class Job:
+    """
+    Завдання планувальника: або інтервал у секундах, або години запуску (at) в поясі tz.
+    jitter — випадкова затримка до jitter секунд, щоб джерела не стартували одночасно.
+    Завдання з однаковою group не виконуються паралельно (наприклад, запис в аркуш).
+    """
+
+    def __init__(self, key, fn, interval=None, at=None, tz="Europe/Kyiv", weekdays=None,
+                 jitter=0, group=None, timeout=DEFAULT_JOB_TIMEOUT, run_on_start=True):
+        if not interval and not at:
+            raise ValueError(f"Завдання {key}: потрібен interval або at")
+        self.key = key
+        self.fn = fn
+        self.interval = interval
+        self.at = at
+        self.tz = tz
+        self.weekdays = weekdays
+        self.jitter = jitter
+        self.group = group
+        self.timeout = timeout
+        self.run_on_start = run_on_start
+        self.next_run = None
+        self.future = None
+        self.started = None
+        self.warned = False
+
+    def schedule_next(self, now: float, first=False):
+        if self.at:
+            base = next_daily_run(self.at, self.tz, now, self.weekdays)
+        elif first and self.run_on_start:
+            base = now
+        else:
+            base = now + self.interval
+        self.next_run = base + random.uniform(0, self.jitter)
+
+    @property
+    def running(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    def describe(self) -> str:
+        if self.at:
+            days = f", дні {self.weekdays}" if self.weekdays is not None else ""
+            return f"о {', '.join(self.at)} ({self.tz}{days})"
+        return f"кожні {self.interval} с" + (f" (+до {self.jitter} с)" if self.jitter else "")
+
+
+class Scheduler:
+    """
+    Один процес, власний розклад для кожного джерела. Завдання запускаються
+    в пулі потоків; якщо попередній запуск ще триває, черговий пропускається.
+    """
+
+    def __init__(self, jobs, max_workers=None):
+        self.jobs = list(jobs)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or len(self.jobs), thread_name_prefix="job")
+        self._stopped = threading.Event()
+
+    def _run(self, job):
+        try:
+            job.fn()
+        except Exception as e:
+            print(f"❌ Завдання {job.key} завершилось помилкою: {e}\n")
+
+    def _busy_groups(self):
+        return {job.group for job in self.jobs if job.group and job.running}
+
+    def tick(self, now: float):
+        """Запускає всі завдання, час яких настав. Повертає момент наступної перевірки."""
+        busy = self._busy_groups()
+        next_checks = []
+        for job in self.jobs:
+            if job.running:
+                if not job.warned and now - job.started > job.timeout:
+                    print(f"⏱️ Завдання {job.key} виконується понад {job.timeout} с.")
+                    job.warned = True
+                if now >= job.next_run:
+                    print(f"⚠️ {job.key}: попередній запуск ще триває — пропускаємо.")
+                    job.schedule_next(now)
+                continue
+            if now < job.next_run:
+                continue
+            if job.group and job.group in busy:
+                # Чекаємо, поки звільниться група, не зсуваючи розклад. Його next_run уже
+                # минув, тож у наступну перевірку він не йде — інакше цикл крутився б без сну
+                next_checks.append(now + GROUP_WAIT_POLL)
+                continue
+
+            job.started = now
+            job.warned = False
+            job.future = self.executor.submit(self._run, job)
+            if job.group:
+                busy.add(job.group)
+            job.schedule_next(now)
+
+        next_checks.extend(job.next_run for job in self.jobs if job.next_run > now)
+        return min(next_checks, default=now + MAX_IDLE_SLEEP)
+
+    def run_forever(self):
+        now = time.time()
+        for job in self.jobs:
+            job.schedule_next(now, first=True)
+            print(f"🗓️ {job.key}: {job.describe()}, наступний запуск "
+                  f"{datetime.fromtimestamp(job.next_run):%Y-%m-%d %H:%M:%S}")
+
+        while not self._stopped.is_set():
+            next_check = self.tick(time.time())
+            # Коротко спимо навіть при далекому розкладі: звільнення групи чи stop() підхоплюються швидко
+            self._stopped.wait(min(MAX_IDLE_SLEEP, max(0.0, next_check - time.time())))
+
+    def stop(self):
+        self._stopped.set()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,225 @@
+import re
+import hashlib
+import threading
+from retry import sheets_read
+from metrics import count
+from config_manager import config_manager
+
+HEADER_OFFSET = 1
+FIRST_DATA_ROW = HEADER_OFFSET + 1
+ROW_WIDTH = 25
+DATE_COLUMN = 0
+ID_COLUMN = 16
+# Службова колонка Z: відбиток рядка, який записує SheetWriter
+HASH_COLUMN = 25
+# Префікс не дає USER_ENTERED перетворити відбиток з самих цифр на число
+HASH_PREFIX = "h"
+
+# "projected" — тільки колонки A, Q, Z через batch_get; "full" — весь аркуш, як раніше
+DEFAULT_INDEX_MODE = "projected"
+# Скільки останніх рядків перечитувати, коли індекс аркуша вже є в пам'яті
+DEFAULT_TAIL_ROWS = 500
+
+NUMBER_RE = re.compile(r"-?\d+(\.\d+)?")
+
+# Індекси, завантажені в цьому процесі: id(worksheet) -> (worksheet, стан індексу).
+# Наступні синхронізації перечитують лише хвіст аркуша.
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def column_letter(index: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA."""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def normalize_cell(value) -> str:
+    """
+    Канонічний вигляд клітинки: 123.45 (float) і "123.45" (рядок з аркуша)
+    дають однаковий результат, тож незмінені рядки не вважаються зміненими.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        number = round(float(value), 8)
+        if number.is_integer() and abs(number) < 1e15:
+            return str(int(number))
+        return repr(number)
+    text = str(value).strip()
+    if NUMBER_RE.fullmatch(text):
+        return normalize_cell(float(text))
+    return text
+
+
+def row_hash(row) -> str:
+    """Відбиток рядка (25 колонок) за канонічними значеннями клітинок."""
+    full_row = list(row)[:ROW_WIDTH] + [""] * (ROW_WIDTH - len(row))
+    payload = "\x1f".join(normalize_cell(cell) for cell in full_row)
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+
+def hash_cell(row) -> str:
+    """Значення колонки Z для рядка."""
+    return HASH_PREFIX + row_hash(row)
+
+
+def parse_hash_cell(value) -> str:
+    """Відбиток з колонки Z або "" для рядків, записаних без нього."""
+    text = str(value or "")
+    return text[len(HASH_PREFIX):] if text.startswith(HASH_PREFIX) else ""
+
+
+def index_settings() -> dict:
+    conf = config_manager().get("google_sheet", {}).get("index", {})
+    return {
+        "mode": conf.get("mode", DEFAULT_INDEX_MODE),
+        "tail_rows": max(1, int(conf.get("tail_rows", DEFAULT_TAIL_ROWS))),
+    }
+
+
+def forget_index(worksheet):
+    """Скидає збережений індекс аркуша, коли рядки в ньому видалено або переставлено."""
+    with _shared_lock:
+        _shared.pop(id(worksheet), None)
+
+
+def _cell(values, offset: int, column: int = 0):
+    if offset < len(values) and len(values[offset]) > column:
+        return values[offset][column]
+    return ""
+
+
+class SheetIndex:
+    """
+    Спільний індекс аркуша: tx_id -> (номер рядка, хеш рядка).
+    Читаються лише колонки A (дата), Q (id) і Z (відбиток), а після першого
+    завантаження в процесі — тільки останні tail_rows рядків. Повне читання
+    колонок — лише якщо індексу ще немає або рядки в аркуші зсунулися.
+    Далі індекс оновлюється сам при додаванні та оновленні рядків.
+    """
+
+    def __init__(self, worksheet, mode=None, tail_rows=None):
+        settings = index_settings() if mode is None or tail_rows is None else {}
+        self.worksheet = worksheet
+        self.mode = mode or settings["mode"]
+        self.tail_rows = tail_rows or settings["tail_rows"]
+        self._state = None
+        self._load_lock = threading.Lock()
+
+    def _read_full(self):
+        # Неформатовані значення: дати і суми приходять числами, як ми їх і записуємо
+        existing_rows = sheets_read(self.worksheet.get_all_values, value_render_option="UNFORMATTED_VALUE")
+        count("sheets_cells_read", sum(len(row) for row in existing_rows))
+
+        rows = {}
+        for i, row in enumerate(existing_rows[HEADER_OFFSET:], start=FIRST_DATA_ROW):
+            if len(row) > ID_COLUMN and normalize_cell(row[ID_COLUMN]):
+                rows[normalize_cell(row[ID_COLUMN])] = (i, row_hash(row))
+        return {"rows": rows, "next_row": len(existing_rows) + 1}
+
+    def _read_columns(self, start_row: int):
+        """
+        Колонки A, Q і Z з рядка start_row до кінця даних.
+        Повертає ([(номер рядка, tx_id, хеш), ...], наступний вільний рядок).
+        Дата є в кожному рядку (і в балансах без id), тож за нею видно кінець аркуша.
+        """
+        ranges = [f"{letter}{start_row}:{letter}"
+                  for letter in (column_letter(DATE_COLUMN), column_letter(ID_COLUMN), column_letter(HASH_COLUMN))]
+        dates, ids, hashes = sheets_read(
+            self.worksheet.batch_get, ranges, value_render_option="UNFORMATTED_VALUE"
+        )
+        count("sheets_cells_read", sum(len(row) for values in (dates, ids, hashes) for row in values))
+
+        entries = []
+        for offset in range(len(ids)):
+            tx_id = normalize_cell(_cell(ids, offset))
+            if tx_id:
+                entries.append((start_row + offset, tx_id, parse_hash_cell(_cell(hashes, offset))))
+        return entries, start_row + max(len(dates), len(ids), len(hashes))
+
+    def _read_projected(self):
+        entries, next_row = self._read_columns(FIRST_DATA_ROW)
+        return {"rows": {tx_id: (i, h) for i, tx_id, h in entries}, "next_row": next_row}
+
+    def _refresh_tail(self, state) -> bool:
+        """
+        Дочитує останні tail_rows рядків у вже завантажений індекс.
+        False, якщо аркуш скоротився або відомі id опинилися в інших рядках.
+        """
+        start_row = max(FIRST_DATA_ROW, state["next_row"] - self.tail_rows)
+        entries, next_row = self._read_columns(start_row)
+        if next_row < state["next_row"]:
+            return False
+        for i, tx_id, h in entries:
+            known = state["rows"].get(tx_id)
+            if known and known[0] != i:
+                return False
+
+        added = sum(1 for i, tx_id, h in entries if tx_id not in state["rows"])
+        for i, tx_id, h in entries:
+            state["rows"][tx_id] = (i, h)
+        state["next_row"] = next_row
+        print(f"📚 Індекс аркуша оновлено з рядка {start_row}: {len(state['rows'])} записів, нових {added}.")
+        return True
+
+    def load(self):
+        if self.mode == "full":
+            self._state = self._read_full()
+            print(f"📚 Індекс аркуша завантажено: {len(self._state['rows'])} записів.")
+            return
+
+        key = id(self.worksheet)
+        with _shared_lock:
+            worksheet, state = _shared.get(key, (None, None))
+            if worksheet is not self.worksheet or not self._refresh_tail(state):
+                state = self._read_projected()
+                _shared[key] = (self.worksheet, state)
+                print(f"📚 Індекс аркуша завантажено (колонки A, Q, Z): {len(state['rows'])} записів.")
+        self._state = state
+
+    def _ensure_loaded(self):
+        if self._state is None:
+            with self._load_lock:
+                if self._state is None:
+                    self.load()
+        return self._state
+
+    def get(self, tx_id):
+        """Повертає (row_number, row_hash) або None, якщо запису немає."""
+        return self._ensure_loaded()["rows"].get(normalize_cell(tx_id))
+
+    def __contains__(self, tx_id):
+        return self.get(tx_id) is not None
+
+    def __len__(self):
+        return len(self._ensure_loaded()["rows"])
+
+    @property
+    def next_row(self) -> int:
+        return self._ensure_loaded()["next_row"]
+
+    def is_changed(self, tx_id, row) -> bool:
+        entry = self.get(tx_id)
+        return entry is None or entry[1] != row_hash(row)
+
+    def mark_updated(self, tx_id, row):
+        # Незавантажений індекс не читаємо заради оновлення: при завантаженні хеш буде свіжий
+        if self._state is None:
+            return
+        entry = self.get(tx_id)
+        if entry:
+            self._state["rows"][normalize_cell(tx_id)] = (entry[0], row_hash(row))
+
+    def mark_appended(self, rows, start_row: int):
+        state = self._ensure_loaded()
+        for offset, row in enumerate(rows):
+            if len(row) > ID_COLUMN and normalize_cell(row[ID_COLUMN]):
+                state["rows"][normalize_cell(row[ID_COLUMN])] = (start_row + offset, row_hash(row))
+        state["next_row"] = max(state["next_row"], start_row + len(rows))
@@ -0,0 +1,116 @@
+from datetime import datetime
+from sheet_index import ID_COLUMN, ROW_WIDTH, HASH_COLUMN, column_letter, normalize_cell
+from sheet_writer import with_hash
+from archive import update_archived_rows
+from ledger import get_ledger, changed_columns
+from table import init_google_sheet
+from retry import sheets_read, sheets_write
+
+# Як записувати рядки провайдера: колонки, які не можна перезаписувати
+# в існуючих рядках, і режим введення значень
+WRITE_OPTIONS = {
+    "privat": {"keep_columns": (9,), "value_input_option": "USER_ENTERED"},
+    "portmone": {"value_input_option": "USER_ENTERED"},
+}
+
+REBUILD_CHUNK_ROWS = 5000
+
+
+def sync_ledger_to_sheet(ledger, writer):
+    """
+    Переносить в аркуш тільки змінені записи реєстру: існуючі рядки оновлюються
+    за індексом аркуша (або у вкладці архіву, куди їх переніс архіватор),
+    нові — додаються в кінець.
+    """
+    pending = ledger.dirty_rows()
+    if not pending:
+        print("✅ Аркуш актуальний — змін у реєстрі немає.")
+        return
+
+    by_provider = {}
+    for provider, row, row_hash, mask in pending:
+        by_provider.setdefault(provider, []).append((row, row_hash, mask))
+
+    # Записи всіх провайдерів ідуть в аркуш одним пакетом на виході з buffered();
+    # позначаємо їх синхронізованими лише після успішного запису
+    synced = []
+    with writer.buffered():
+        for provider, items in by_provider.items():
+            options = WRITE_OPTIONS.get(provider, {})
+            value_input_option = options.get("value_input_option", "RAW")
+            rows_to_update = []
+            rows_to_append = []
+            archived_updates = {}
+            unchanged = 0
+
+            missing = [normalize_cell(row[ID_COLUMN]) for row, row_hash, mask in items if row[ID_COLUMN] not in writer.index]
+            archived = ledger.archived_locations(missing) if missing else {}
+
+            for row, row_hash, mask in items:
+                existing = writer.index.get(row[ID_COLUMN])
+                location = None if existing else archived.get(normalize_cell(row[ID_COLUMN]))
+                if (existing and existing[1] == row_hash) or (location and location[3] == row_hash):
+                    # В аркуші вже той самий вміст — не переписуємо
+                    unchanged += 1
+                elif existing:
+                    rows_to_update.append((existing[0], row, changed_columns(mask)))
+                elif location:
+                    archived_updates.setdefault(location[:2], []).append(
+                        (location[2], row, changed_columns(mask), row_hash)
+                    )
+                else:
+                    rows_to_append.append(row + [""] * (ROW_WIDTH - len(row)))
+
+            if unchanged:
+                print(f"✅ {provider}: {unchanged} рядків в аркуші вже актуальні.")
+
+            if rows_to_update:
+                writer.update_rows(
+                    rows_to_update,
+                    keep_columns=options.get("keep_columns", ()),
+                    value_input_option=value_input_option,
+                )
+                print(f"🔁 {provider}: оновлено {len(rows_to_update)} рядків.")
+
+            if archived_updates:
+                orphaned = update_archived_rows(
+                    ledger,
+                    archived_updates,
+                    keep_columns=options.get("keep_columns", ()),
+                    value_input_option=value_input_option,
+                )
+                rows_to_append.extend(row + [""] * (ROW_WIDTH - len(row)) for row in orphaned)
+
+            if rows_to_append:
+                start_row = writer.append(rows_to_append, value_input_option=value_input_option)
+                print(f"➕ {provider}: додано {len(rows_to_append)} рядків з рядка {start_row}.")
+
+            synced.extend((provider, str(row[ID_COLUMN]), row_hash) for row, row_hash, mask in items)
+
+    ledger.mark_synced(synced)
+
+
+def rebuild_sheet(ledger, spreadsheet, source_worksheet, title=None):
+    """
+    Відновлює аркуш з реєстру без запитів до провайдерів: створює нову вкладку,
+    копіює заголовок з робочої і записує всі рядки реєстру за датою (з відбитками в колонці Z).
+    """
+    rows = [with_hash(row) for provider, row, row_hash in ledger.all_rows()]
+    last_col = column_letter(HASH_COLUMN)
+    title = title or f"rebuild-{datetime.now().strftime('%Y%m%d-%H%M')}"
+    header = sheets_read(source_worksheet.row_values, 1)
+
+    worksheet = sheets_write(spreadsheet.add_worksheet, title=title, rows=len(rows) + 1, cols=HASH_COLUMN + 1)
+    sheets_write(worksheet.update, f"A1:{last_col}1", [header[:HASH_COLUMN + 1] + [""] * (HASH_COLUMN + 1 - len(header))])
+    for offset in range(0, len(rows), REBUILD_CHUNK_ROWS):
+        chunk = rows[offset:offset + REBUILD_CHUNK_ROWS]
+        start_row = offset + 2
+        sheets_write(worksheet.update, f"A{start_row}:{last_col}{start_row + len(chunk) - 1}", chunk, value_input_option="USER_ENTERED")
+    print(f"🧱 Вкладку '{title}' відновлено з реєстру: {len(rows)} рядків.")
+    return worksheet
+
+
+if __name__ == "__main__":
+    # Відновлення аркуша з реєстру в нову вкладку без звернень до провайдерів
+    source = init_google_sheet()
+    rebuild_sheet(get_ledger(), source.spreadsheet, source)
@@ -0,0 +1,236 @@
+import json
+import threading
+from contextlib import contextmanager
+from sheet_index import SheetIndex, ID_COLUMN, ROW_WIDTH, HASH_COLUMN, column_letter, hash_cell, forget_index
+from retry import sheets_write
+from sheets_client import forget_worksheet
+from metrics import count
+
+# Обмеження на один batch_update: Sheets приймає до ~10 МБ, тримаємо запас
+BATCH_MAX_BYTES = 2_000_000
+BATCH_MAX_RANGES = 1000
+# Додані рядки в буфері діляться на діапазони такого розміру, щоб влізти в BATCH_MAX_BYTES
+APPEND_CHUNK_ROWS = 1000
+# Оновлення рядків, між якими не більше стількох незмінних рядків (колонок), пишуться одним діапазоном
+MAX_ROW_GAP = 2
+MAX_COL_GAP = 2
+
+
+def with_hash(row) -> list:
+    """Рядок на 25 колонок і відбиток у колонці Z."""
+    return list(row) + [""] * (ROW_WIDTH - len(row)) + [hash_cell(row)]
+
+
+def _runs(numbers, max_gap: int):
+    """[1, 2, 5, 9] з max_gap=2 -> [(1, 5), (9, 9)]."""
+    runs = []
+    for number in numbers:
+        if runs and number - runs[-1][1] <= max_gap + 1:
+            runs[-1] = (runs[-1][0], number)
+        else:
+            runs.append((number, number))
+    return runs
+
+
+def plan_row_updates(rows_to_update, keep_columns=(), max_gap=MAX_ROW_GAP, max_rows=APPEND_CHUNK_ROWS):
+    """
+    Діапазони batch_update для оновлення рядків [(row_number, row, columns), ...],
+    де columns — індекси змінених колонок (None — усі). Відбиток у колонці Z пишеться
+    завжди, keep_columns — ніколи. Сусідні рядки (з пропуском до max_gap рядків)
+    об'єднуються в блок, а в блоці близькі змінені колонки — в прямокутні діапазони.
+    Клітинки всередині діапазону, які не треба чіпати, передаються як None — Sheets їх пропускає.
+    """
+    cells = {}
+    for row_number, row, columns in rows_to_update:
+        full_row = with_hash(row)
+        wanted = range(len(full_row)) if columns is None else set(columns) | {HASH_COLUMN}
+        cells[row_number] = {col: full_row[col] for col in wanted if col < len(full_row) and col not in keep_columns}
+
+    blocks = []
+    for row_number in sorted(cells):
+        block = blocks[-1] if blocks else None
+        if block and row_number - block[-1] <= max_gap + 1 and row_number - block[0] < max_rows:
+            block.append(row_number)
+        else:
+            blocks.append([row_number])
+
+    batch_data = []
+    for block in blocks:
+        columns = set()
+        for row_number in block:
+            columns.update(cells[row_number])
+        for first_col, last_col in _runs(sorted(columns), MAX_COL_GAP):
+            values = [
+                [cells.get(row_number, {}).get(col) for col in range(first_col, last_col + 1)]
+                for row_number in range(block[0], block[-1] + 1)
+            ]
+            batch_data.append({
+                "range": f"{column_letter(first_col)}{block[0]}:{column_letter(last_col)}{block[-1]}",
+                "values": values,
+            })
+    return batch_data
+
+
+def chunk_batch(batch_data):
+    """
+    Ділить дані batch_update на частини, що вкладаються в ліміти запиту Sheets.
+    Повертає пари (chunk, розмір у байтах).
+    """
+    chunk = []
+    chunk_bytes = 0
+    for item in batch_data:
+        item_bytes = len(json.dumps(item, ensure_ascii=False, default=str))
+        if chunk and (chunk_bytes + item_bytes > BATCH_MAX_BYTES or len(chunk) >= BATCH_MAX_RANGES):
+            yield chunk, chunk_bytes
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(item)
+        chunk_bytes += item_bytes
+    if chunk:
+        yield chunk, chunk_bytes
+
+
+class SheetWriter:
+    """
+    Єдина точка запису в аркуш. Експортери можуть працювати паралельно,
+    але всі записи йдуть послідовно під одним локом, а номери рядків
+    для нових записів видаються централізовано з індексу.
+
+    У блоці buffered() оновлення і додавання лише ставляться в чергу,
+    а на виході аркуш один раз розширюється і все відправляється
+    мінімальною кількістю batch_update.
+    """
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.index = SheetIndex(worksheet)
+        self.lock = threading.RLock()
+        self._hash_column_ready = False
+        # {параметри запису: [діапазони]} і останній зайнятий рядок, поки діє buffered()
+        self._pending = None
+        self._pending_end_row = 0
+
+    def _forget(self):
+        """Після невдалого запису індекс і закешований аркуш можуть не відповідати таблиці."""
+        forget_index(self.worksheet)
+        forget_worksheet(self.worksheet)
+
+    def _ensure_hash_column(self):
+        """Аркуш, створений з колонками A:Y, розширюємо до Z один раз."""
+        if self._hash_column_ready:
+            return
+        missing = HASH_COLUMN + 1 - self.worksheet.col_count
+        if missing > 0:
+            sheets_write(self.worksheet.add_cols, missing)
+            print(f"➕ Додано колонку {column_letter(HASH_COLUMN)} для відбитків рядків.")
+        self._hash_column_ready = True
+
+    def batch_update(self, data, **kwargs):
+        with self.lock:
+            for chunk, chunk_bytes in chunk_batch(data):
+                sheets_write(self.worksheet.batch_update, chunk, **kwargs)
+                count("sheets_bytes", chunk_bytes)
+                count("sheets_cells", sum(len(row) for item in chunk for row in item["values"]))
+
+    def _write(self, data, **kwargs):
+        if self._pending is None:
+            try:
+                self.batch_update(data, **kwargs)
+            except Exception:
+                self._forget()
+                raise
+        else:
+            self._pending.setdefault(tuple(sorted(kwargs.items())), []).extend(data)
+
+    @contextmanager
+    def buffered(self):
+        """
+        Збирає записи всього блоку і відправляє їх на виході через flush().
+        Якщо блок завершився помилкою, черга відкидається, а індекс аркуша
+        перечитується наступного разу — номери рядків у ньому вже видано.
+        """
+        with self.lock:
+            if self._pending is not None:
+                yield self
+                return
+            self._pending = {}
+            self._pending_end_row = 0
+            try:
+                yield self
+            except Exception:
+                self._pending = None
+                self._forget()
+                raise
+            self.flush()
+
+    def flush(self):
+        """Один add_rows під усі додані рядки і batch_update на кожен режим введення значень."""
+        with self.lock:
+            pending, end_row = self._pending, self._pending_end_row
+            self._pending = None
+            if not pending:
+                return
+            try:
+                current_max_rows = self.worksheet.row_count
+                if end_row > current_max_rows:
+                    sheets_write(self.worksheet.add_rows, end_row - current_max_rows)
+                    print(f"➕ Додано {end_row - current_max_rows} нових рядків до аркуша.")
+                for options, data in pending.items():
+                    self.batch_update(data, **dict(options))
+            except Exception:
+                self._forget()
+                raise
+            print(f"📤 Записано в аркуш {sum(len(data) for data in pending.values())} діапазонів.")
+
+    def update(self, range_name, values, **kwargs):
+        with self.lock:
+            return sheets_write(self.worksheet.update, range_name, values, **kwargs)
+
+    def update_rows(self, rows_to_update, keep_columns=(), **kwargs):
+        """
+        Оновлює змінені рядки [(row_number, row, columns), ...] кількома batch_update:
+        сусідні рядки йдуть одним діапазоном, і пишуться лише змінені колонки
+        (columns=None — увесь рядок). Оновлює індекс.
+        """
+        batch_data = plan_row_updates(rows_to_update, keep_columns)
+
+        with self.lock:
+            self._ensure_hash_column()
+            self._write(batch_data, **kwargs)
+            for row_number, row, columns in rows_to_update:
+                self.index.mark_updated(row[ID_COLUMN], row)
+
+    def append(self, rows, **kwargs) -> int:
+        """Додає рядки (з відбитками в колонці Z) в кінець аркуша і повертає номер першого доданого рядка."""
+        with self.lock:
+            self._ensure_hash_column()
+            start_row = self.index.next_row
+            end_row = start_row + len(rows) - 1
+
+            last_col = column_letter(HASH_COLUMN)
+            if self._pending is not None:
+                data = []
+                for offset in range(0, len(rows), APPEND_CHUNK_ROWS):
+                    chunk = rows[offset:offset + APPEND_CHUNK_ROWS]
+                    first_row = start_row + offset
+                    data.append({
+                        "range": f"A{first_row}:{last_col}{first_row + len(chunk) - 1}",
+                        "values": [with_hash(row) for row in chunk],
+                    })
+                self._write(data, **kwargs)
+                self._pending_end_row = max(self._pending_end_row, end_row)
+            else:
+                try:
+                    current_max_rows = self.worksheet.row_count
+                    if end_row > current_max_rows:
+                        sheets_write(self.worksheet.add_rows, end_row - current_max_rows)
+                        print(f"➕ Додано {end_row - current_max_rows} нових рядків до аркуша.")
+
+                    sheets_write(self.worksheet.update, f"A{start_row}:{last_col}{end_row}",
+                                 [with_hash(row) for row in rows], **kwargs)
+                except Exception:
+                    self._forget()
+                    raise
+            count("sheets_rows_appended", len(rows))
+            self.index.mark_appended(rows, start_row)
+            return start_row
@@ -0,0 +1,83 @@
+import threading
+from datetime import datetime, timedelta
+import gspread
+from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import Request
+from config_manager import config_manager
+
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+DEFAULT_CREDENTIALS_PATH = "api-finanse-de717294db0b.json"
+DEFAULT_SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1Fg9Fo4TLqc0KYbC_GHBRccFZg8a5g9NJPfyMoSLSKM8/edit?usp=sharing"
+DEFAULT_WORKSHEET_NAME = "Аркуш1"
+
+# Оновлюємо токен заздалегідь, а не на першому запиті після його закінчення
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+_lock = threading.RLock()
+_creds = None
+_client = None
+_spreadsheets = {}
+_worksheets = {}
+
+
+def sheet_settings() -> dict:
+    sheet_conf = config_manager().get("google_sheet", {})
+    return {
+        "credentials_path": sheet_conf.get("credentials_path", DEFAULT_CREDENTIALS_PATH),
+        "spreadsheet_url": sheet_conf.get("spreadsheet_url", DEFAULT_SPREADSHEET_URL),
+        "worksheet_name": sheet_conf.get("worksheet_name", DEFAULT_WORKSHEET_NAME),
+    }
+
+
+def _refresh_if_needed():
+    expiry = _creds.expiry
+    if not _creds.token or expiry is None or expiry - datetime.utcnow() < TOKEN_REFRESH_MARGIN:
+        _creds.refresh(Request())
+
+
+def get_client() -> gspread.Client:
+    """
+    Один клієнт Google Sheets на процес: ключ сервісного акаунта читається
+    і авторизується один раз, токен оновлюється до закінчення терміну дії.
+    """
+    global _creds, _client
+    with _lock:
+        if _client is None:
+            _creds = Credentials.from_service_account_file(sheet_settings()["credentials_path"], scopes=SCOPE)
+            _client = gspread.authorize(_creds)
+        _refresh_if_needed()
+        return _client
+
+
+def get_spreadsheet(url=None) -> gspread.Spreadsheet:
+    url = url or sheet_settings()["spreadsheet_url"]
+    with _lock:
+        client = get_client()
+        if url not in _spreadsheets:
+            _spreadsheets[url] = client.open_by_url(url)
+        return _spreadsheets[url]
+
+
+def get_worksheet(name=None, url=None) -> gspread.Worksheet:
+    """Повертає закешований аркуш, щоб не робити open_by_url і запит метаданих щоразу."""
+    settings = sheet_settings()
+    url = url or settings["spreadsheet_url"]
+    name = name or settings["worksheet_name"]
+    with _lock:
+        spreadsheet = get_spreadsheet(url)
+        if (url, name) not in _worksheets:
+            _worksheets[(url, name)] = spreadsheet.worksheet(name)
+        return _worksheets[(url, name)]
+
+
+def forget_worksheet(worksheet):
+    """
+    Прибирає аркуш з кешу, коли запис у нього не вдався: сітку могли зменшити
+    або вкладку перейменувати ззовні, і row_count з title у цьому об'єкті застаріли.
+    Наступний get_worksheet заново прочитає метадані.
+    """
+    with _lock:
+        for key, cached in list(_worksheets.items()):
+            if cached is worksheet:
+                del _worksheets[key]
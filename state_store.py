@@ -0,0 +1,31 @@
+import json
+import os
+import threading
+
+STATE_FILE = "state.json"
+
+_lock = threading.Lock()
+
+
+def _load():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_state(section: str, key: str, default=None):
+    """Повертає збережене значення (чекпоінт, курсор тощо) з локального state.json."""
+    with _lock:
+        return _load().get(section, {}).get(key, default)
+
+
+def set_state(section: str, key: str, value):
+    """Зберігає значення атомарно (через тимчасовий файл), щоб збій не зіпсував файл."""
+    with _lock:
+        state = _load()
+        state.setdefault(section, {})[key] = value
+        tmp_file = f"{STATE_FILE}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, STATE_FILE)
@@ -0,0 +1,41 @@
+import hashlib
+from datetime import datetime, timedelta
+from state_store import get_state, set_state
+
+CURSOR_SECTION = "sync_cursors"
+
+# Перекриття з попереднім запуском: транзакції, що з'явились у API із затримкою.
+# Джерела, де старі записи ще змінюються, задають довше; запис конфігу — overlap_hours
+CURSOR_OVERLAP = timedelta(hours=2)
+
+
+def token_id(token: str) -> str:
+    """Короткий відбиток токена для ключів стану — сам токен у state.json не пишемо."""
+    return hashlib.sha1(token.encode("utf-8")).hexdigest()[:10]
+
+
+def cursor_overlap(entry: dict, default: timedelta = CURSOR_OVERLAP) -> timedelta:
+    """Перекриття з overlap_hours запису конфігу, інакше default."""
+    hours = entry.get("overlap_hours")
+    if hours is None:
+        return default
+    return timedelta(hours=hours)
+
+
+def sync_window(provider: str, account: str, days: int, overlap: timedelta = CURSOR_OVERLAP):
+    """
+    (from_dt, to_dt) для чергового запуску: від курсора мінус перекриття до зараз.
+    Поки курсора немає (перший запуск) — останні days днів.
+    """
+    to_dt = datetime.now()
+    cursor = get_state(CURSOR_SECTION, f"{provider}:{account}")
+    if cursor:
+        from_dt = datetime.fromisoformat(cursor) - overlap
+    else:
+        from_dt = to_dt - timedelta(days=days)
+    return from_dt, to_dt
+
+
+def save_cursor(provider: str, account: str, synced_until: datetime):
+    """Фіксує момент, до якого дані провайдера отримано повністю."""
+    set_state(CURSOR_SECTION, f"{provider}:{account}", synced_until.isoformat(timespec="seconds"))
@@ -1,18 +1,5 @@
-import requests
-import time
-import json
-import os
-from dotenv import load_dotenv
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from datetime import datetime, timedelta
+from sheets_client import get_worksheet
 
-def init_google_sheet():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name("api-finanse-de717294db0b.json", scope)
-    client = gspread.authorize(creds)
 
-    spreadsheet = client.open_by_url(
-        "https://docs.google.com/spreadsheets/d/1Fg9Fo4TLqc0KYbC_GHBRccFZg8a5g9NJPfyMoSLSKM8/edit?usp=sharing"
-    )
-    return spreadsheet.worksheet("Аркуш1")
\ No newline at end of file
+def init_google_sheet():
+    return get_worksheet()
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+pytest.importorskip("requests")
+
+from etherscan.etherscan import build_erc20_rows  # noqa: E402
+from tronscan.transactions import build_trc20_rows  # noqa: E402
+
+WALLET = "0xwallet"
+TRON_WALLET = "TWallet"
+
+
+def test_erc20_rows_counterparty_for_incoming_and_outgoing():
+    txs = [
+        {"hash": "in", "from": "0xsender", "to": WALLET, "value": "1500000", "tokenDecimal": "6",
+         "tokenSymbol": "USDT", "timeStamp": "1751362093"},
+        {"hash": "out", "from": WALLET, "to": "0xreceiver", "value": "2000000", "tokenDecimal": "6",
+         "tokenSymbol": "USDT", "timeStamp": "1751362093"},
+    ]
+    incoming, outgoing = build_erc20_rows(txs, WALLET)
+
+    assert (incoming[4], incoming[5], incoming[13], incoming[16]) == ("debit", 1.5, "0xsender", "in")
+    assert (outgoing[4], outgoing[5], outgoing[13], outgoing[16]) == ("credit", 2.0, "0xreceiver", "out")
+
+
+def test_trc20_rows_counterparty_for_incoming_and_outgoing():
+    txs = [
+        {"transaction_id": "in", "from_address": "TSender", "to_address": TRON_WALLET, "quant": "1500000",
+         "block_ts": 1751362093000, "token_info": {"decimals": 6, "symbol": "USDT"}},
+        {"transaction_id": "out", "from_address": TRON_WALLET, "to_address": "TReceiver", "quant": "2000000",
+         "block_ts": 1751362093000, "token_info": {"decimals": 6, "symbol": "USDT"}},
+    ]
+    incoming, outgoing = build_trc20_rows(txs, TRON_WALLET)
+
+    assert (incoming[4], incoming[5], incoming[13], incoming[16]) == ("debit", 1.5, "TSender", "in")
+    assert (outgoing[4], outgoing[5], outgoing[13], outgoing[16]) == ("credit", 2.0, "TReceiver", "out")
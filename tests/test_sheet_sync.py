@@ -0,0 +1,133 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+pytest.importorskip("requests")
+pytest.importorskip("gspread")
+
+import sheet_index  # noqa: E402
+from benchmarks.fake_worksheet import FakeWorksheet  # noqa: E402
+from ledger import Ledger, changed_columns  # noqa: E402
+from sheet_index import SheetIndex, HASH_COLUMN, ID_COLUMN, ROW_WIDTH, hash_cell  # noqa: E402
+from sheet_sync import sync_ledger_to_sheet  # noqa: E402
+from sheet_writer import SheetWriter, plan_row_updates, with_hash  # noqa: E402
+
+HEADER = [f"h{col}" for col in range(HASH_COLUMN + 1)]
+
+
+def make_row(tx_id, amount=1.0, date=45000.5, **columns):
+    row = [""] * ROW_WIDTH
+    row[0], row[1], row[5], row[ID_COLUMN] = date, "mono", amount, tx_id
+    for name, value in columns.items():
+        row[int(name[1:])] = value
+    return row
+
+
+@pytest.fixture(autouse=True)
+def index_settings(monkeypatch):
+    # Без config.json: індекс за колонками A, Q, Z і невеликий хвіст
+    monkeypatch.setattr(sheet_index, "index_settings", lambda: {"mode": "projected", "tail_rows": 3})
+    sheet_index._shared.clear()
+    yield
+    sheet_index._shared.clear()
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = Ledger(str(tmp_path / "ledger.db"))
+    yield ledger
+    ledger.close()
+
+
+def test_plan_row_updates_skips_unchanged_cells_in_gap_rows():
+    data = plan_row_updates([(2, make_row("a", 5.0), [5]), (4, make_row("b", 7.0), [5])])
+
+    assert [item["range"] for item in data] == ["F2:F4", "Z2:Z4"]
+    assert data[0]["values"] == [[5.0], [None], [7.0]]
+    assert data[1]["values"] == [[hash_cell(make_row("a", 5.0))], [None], [hash_cell(make_row("b", 7.0))]]
+
+
+def test_plan_row_updates_never_writes_keep_columns():
+    data = plan_row_updates([(2, make_row("a", c9=100.0), None)], keep_columns=(9,))
+
+    # Колонка J всередині діапазону передається як None — Sheets лишає її як є
+    [item] = data
+    assert item["range"] == "A2:Z2"
+    assert item["values"][0][9] is None
+    assert item["values"][0][5] == 1.0
+
+
+def test_ledger_accumulates_changed_columns_while_dirty(ledger):
+    ledger.upsert_rows("mono", [make_row("a")])
+    [(provider, row, row_hash, mask)] = ledger.dirty_rows()
+    assert changed_columns(mask) is None
+
+    ledger.mark_synced([("mono", "a", row_hash)])
+    ledger.upsert_rows("mono", [make_row("a", 2.0)])
+    ledger.upsert_rows("mono", [make_row("a", 2.0, c10="note")])
+    [(provider, row, row_hash, mask)] = ledger.dirty_rows()
+    assert changed_columns(mask) == [5, 10]
+
+    ledger.mark_synced([("mono", "a", row_hash)])
+    ledger.upsert_rows("mono", [make_row("a", 3.0, c10="note")])
+    [(provider, row, row_hash, mask)] = ledger.dirty_rows()
+    assert changed_columns(mask) == [5]
+
+
+def test_sync_updates_only_changed_cells_and_appends_new_rows(ledger):
+    worksheet = FakeWorksheet([HEADER])
+    ledger.upsert_rows("mono", [make_row("a"), make_row("b")])
+    sync_ledger_to_sheet(ledger, SheetWriter(worksheet))
+    assert [row[ID_COLUMN] for row in worksheet.rows[1:]] == ["a", "b"]
+
+    # Колонку K хтось заповнив вручну — оновлення суми її не чіпає
+    worksheet.rows[1][10] = "вручну"
+    ledger.upsert_rows("mono", [make_row("a", 9.0), make_row("c")])
+    sync_ledger_to_sheet(ledger, SheetWriter(worksheet))
+
+    assert worksheet.rows[1][5] == 9.0
+    assert worksheet.rows[1][10] == "вручну"
+    assert worksheet.rows[1][HASH_COLUMN] == hash_cell(make_row("a", 9.0))
+    assert [row[ID_COLUMN] for row in worksheet.rows[1:]] == ["a", "b", "c"]
+    assert ledger.dirty_rows() == []
+
+    written = worksheet.cells_written
+    sync_ledger_to_sheet(ledger, SheetWriter(worksheet))
+    assert worksheet.cells_written == written
+
+
+def test_sync_keeps_privat_balance_column(ledger):
+    worksheet = FakeWorksheet([HEADER])
+    ledger.upsert_rows("privat", [make_row("a", c9=100.0)])
+    sync_ledger_to_sheet(ledger, SheetWriter(worksheet))
+
+    ledger.upsert_rows("privat", [make_row("a", 2.0, c9=200.0)])
+    sync_ledger_to_sheet(ledger, SheetWriter(worksheet))
+
+    assert (worksheet.rows[1][5], worksheet.rows[1][9]) == (2.0, 100.0)
+
+
+def test_index_tail_refresh_picks_up_rows_appended_elsewhere():
+    worksheet = FakeWorksheet([HEADER] + [with_hash(make_row(tx_id)) for tx_id in "abcde"])
+    assert SheetIndex(worksheet).get("e") == (6, hash_cell(make_row("e"))[1:])
+
+    worksheet.rows.append(with_hash(make_row("f")))
+    index = SheetIndex(worksheet)
+    assert index.get("f")[0] == 7
+    assert index.get("a")[0] == 2
+    assert index.next_row == 8
+
+
+def test_index_reloads_when_rows_shift():
+    worksheet = FakeWorksheet([HEADER] + [with_hash(make_row(tx_id)) for tx_id in "abcde"])
+    SheetIndex(worksheet).get("a")
+
+    # Рядок видалили, а в кінець дописали новий: довжина та сама, але id в хвості зсунулись
+    del worksheet.rows[1]
+    worksheet.rows.append(with_hash(make_row("f")))
+    index = SheetIndex(worksheet)
+
+    assert index.get("a") is None
+    assert [index.get(tx_id)[0] for tx_id in "bcdef"] == [2, 3, 4, 5, 6]
@@ -1,35 +1,171 @@
 import time
-import requests
-from datetime import datetime, timedelta
-from table import init_google_sheet
+from datetime import datetime
+from ledger import get_ledger
 from config_manager import config_manager
-
-
-def format_amount(value):
-    try:
-        return round(float(value), 6)
-    except (ValueError, TypeError):
-        return 0.0
-
-
-def timestamp_to_serial_date(ts: int):
-    try:
-        dt = datetime.fromtimestamp(ts)
-        epoch = datetime(1899, 12, 30)
-        delta = dt - epoch
-        return delta.days + (delta.seconds + delta.microseconds / 1e6) / 86400
-    except Exception:
-        return ""
-
-
-def export_trc20_transactions_troscan_to_google_sheets():
+from http_client import http_get
+from pipeline import store_batches
+from normalize import serial_dates, amounts, directions, emit_rows
+from sync_cursor import sync_window, save_cursor, cursor_overlap
+
+TRONSCAN_TRANSFERS_URL = "https://apilist.tronscanapi.com/api/token_trc20/transfers"
+TRONGRID_TRANSFERS_URL = "https://api.trongrid.io/v1/accounts/{address}/transactions/trc20"
+
+
+def _api_headers(api_key):
+    return {"TRON-PRO-API-KEY": api_key} if api_key else {}
+
+
+def iter_trc20_transfers(address: str, from_dt: datetime, to_dt: datetime, limit: int = 50,
+                         api_key=None, strict: bool = False):
+    """
+    Генератор TRC20-переказів адреси через Tronscan у межах [from_dt, to_dt].
+    Межі часу передаються серверу, а сторінки йдуть за курсором часу: наступна
+    сторінка — все, що старіше за найстаріший уже отриманий переказ. Так глибина
+    історії не впирається в ліміт зміщення start, а погодинна синхронізація — 1-2 запити.
+    strict=True — помилка API кидає виняток замість тихої зупинки.
+    """
+    from_ms = int(from_dt.timestamp() * 1000)
+    cursor_ms = int(to_dt.timestamp() * 1000)
+    start = 0
+    seen_at_cursor = set()
+    total = 0
+
+    while True:
+        params = {
+            "limit": limit,
+            "start": start,
+            "relatedAddress": address,
+            "start_timestamp": from_ms,
+            # +1 мс: межа включає курсор, навіть якщо сервер трактує її як виключну
+            "end_timestamp": cursor_ms + 1,
+            "sort": "-timestamp",
+            "confirm": "true",
+            "filterTokenValue": 1,
+        }
+        response = http_get(TRONSCAN_TRANSFERS_URL, params=params, headers=_api_headers(api_key))
+        if response.status_code != 200:
+            print(f"❌ Помилка при запиті: статус {response.status_code}")
+            if strict:
+                raise Exception(f"Tronscan API: HTTP {response.status_code}")
+            return
+
+        transactions = response.json().get("token_transfers", [])
+        # Перекази рівно на межі курсора вже могли прийти попередньою сторінкою
+        page = [
+            tx for tx in transactions
+            if from_ms <= tx["block_ts"] <= cursor_ms and tx.get("transaction_id") not in seen_at_cursor
+        ]
+        total += len(page)
+        print(f"🔄 Отримано {len(page)} транзакцій (загалом: {total})")
+        yield from page
+
+        if len(transactions) < limit:
+            print("✅ Усі TRC20 транзакції отримано.")
+            return
+
+        oldest_ms = min(tx["block_ts"] for tx in transactions)
+        if oldest_ms >= cursor_ms:
+            # Уся сторінка на межі курсора — лише тоді зсуваємось зміщенням
+            start += limit
+        else:
+            start = 0
+            seen_at_cursor = set()
+            cursor_ms = oldest_ms
+        seen_at_cursor.update(tx.get("transaction_id") for tx in transactions if tx["block_ts"] == cursor_ms)
+        time.sleep(0.4)
+
+
+def _from_trongrid(tx) -> dict:
+    """Запис TronGrid -> формат Tronscan, з яким працює build_trc20_rows."""
+    token_info = tx.get("token_info", {})
+    return {
+        "transaction_id": tx.get("transaction_id", ""),
+        "block_ts": tx.get("block_timestamp", 0),
+        "from_address": tx.get("from", ""),
+        "to_address": tx.get("to", ""),
+        "quant": tx.get("value", "0"),
+        "token_info": {"symbol": token_info.get("symbol", ""), "decimals": token_info.get("decimals", 6)},
+    }
+
+
+def iter_trongrid_transfers(address: str, from_dt: datetime, to_dt: datetime, limit: int = 200,
+                            api_key=None, strict: bool = False):
+    """
+    Генератор TRC20-переказів через TronGrid: межі min/max_timestamp на сервері,
+    наступна сторінка — за fingerprint з meta, без зміщень.
+    """
+    url = TRONGRID_TRANSFERS_URL.format(address=address)
+    params = {
+        "limit": limit,
+        "min_timestamp": int(from_dt.timestamp() * 1000),
+        "max_timestamp": int(to_dt.timestamp() * 1000),
+        "only_confirmed": "true",
+        "order_by": "block_timestamp,desc",
+    }
+    total = 0
+
+    while True:
+        response = http_get(url, params=params, headers=_api_headers(api_key))
+        data = response.json() if response.status_code == 200 else {}
+        if response.status_code != 200 or not data.get("success", False):
+            print(f"❌ Помилка TronGrid: статус {response.status_code}")
+            if strict:
+                raise Exception(f"TronGrid API: HTTP {response.status_code}")
+            return
+
+        page = [_from_trongrid(tx) for tx in data.get("data", []) if tx.get("type", "Transfer") == "Transfer"]
+        total += len(page)
+        print(f"🔄 Отримано {len(page)} транзакцій (загалом: {total})")
+        yield from page
+
+        fingerprint = data.get("meta", {}).get("fingerprint")
+        if not fingerprint:
+            print("✅ Усі TRC20 транзакції отримано.")
+            return
+        params["fingerprint"] = fingerprint
+
+
+# Джерело переказів для адреси: ключ "api" у записі TRC20 конфігу
+TRC20_SOURCES = {
+    "tronscan": iter_trc20_transfers,
+    "trongrid": iter_trongrid_transfers,
+}
+
+
+def build_trc20_rows(txs, address: str):
+    """Пачка TRC20-переказів -> рядки аркуша (див. normalize). Комісію Tronscan тут не віддає."""
+    address_lower = address.lower()
+    to_addresses = [tx.get("to_address", "") for tx in txs]
+    is_debit = [to_address.lower() == address_lower for to_address in to_addresses]
+    token_infos = [tx.get("token_info", {}) for tx in txs]
+    amount_values = amounts(
+        [tx.get("quant", 0) for tx in txs],
+        decimals=[info.get("decimals", 6) for info in token_infos],
+        ndigits=6,
+    )
+
+    return emit_rows(len(txs), {
+        0: serial_dates([int(tx["block_ts"]) // 1000 for tx in txs]),
+        1: "TRC20",
+        3: address,
+        4: directions(is_debit),
+        5: amount_values,
+        6: amount_values,
+        7: [info.get("symbol", "") or "USDT" for info in token_infos],
+        13: [tx.get("from_address", "") if debit else tx.get("to_address", "") for tx, debit in zip(txs, is_debit)],
+        16: [tx.get("transaction_id", "") for tx in txs],
+    })
+
+
+def export_trc20_transactions_troscan_to_google_sheets(ledger=None):
     CONFIG = config_manager()
     trc20_entries = CONFIG.get("TRC20", [])
     if not trc20_entries:
         print("⚠️ TRC20 адреси у конфігурації не знайдено.")
         return
 
-    worksheet = init_google_sheet()
+    if ledger is None:
+        ledger = get_ledger()
 
     for item in trc20_entries:
         address = item.get("address")
@@ -37,115 +173,21 @@ def export_trc20_transactions_troscan_to_google_sheets():
             continue
 
         days = item.get("days", 5)
-        from_date = datetime.now().date() - timedelta(days=days)
-        to_date = datetime.now().date()
-
-        print(f"\n📥 Обробка TRC20 адреси: {address}, діапазон дат: {from_date} - {to_date}")
+        from_dt, to_dt = sync_window("trc20", address.lower(), days, cursor_overlap(item))
 
-        limit = 50
-        start = 0
-        all_transactions = []
+        print(f"\n📥 Обробка TRC20 адреси ({item.get('api', 'tronscan')}): {address}, період: {from_dt:%Y-%m-%d %H:%M} - {to_dt:%Y-%m-%d %H:%M}")
 
-        while True:
-            url = (
-                f"https://apilist.tronscanapi.com/api/token_trc20/transfers"
-                f"?limit={limit}&start={start}&relatedAddress={address}&confirm=true&filterTokenValue=1"
-            )
-
-            response = requests.get(url)
-            if response.status_code != 200:
-                print(f"❌ Помилка при запиті: статус {response.status_code}")
-                break
-
-            data = response.json()
-            transactions = data.get("token_transfers", [])
-            if not transactions:
-                print("✅ Усі TRC20 транзакції отримано.")
-                break
-
-            filtered_txs = []
-            for tx in transactions:
-                tx_date = datetime.fromtimestamp(tx["block_ts"] / 1000).date()
-                if from_date <= tx_date <= to_date:
-                    tx["__wallet_address__"] = address
-                    filtered_txs.append(tx)
-                elif tx_date < from_date:
-                    break
-
-            all_transactions.extend(filtered_txs)
-
-            print(f"🔄 Отримано {len(filtered_txs)} транзакцій (загалом: {len(all_transactions)})")
+        source = item.get("api", "tronscan")
+        fetch = TRC20_SOURCES.get(source)
+        if fetch is None:
+            print(f"⚠️ Невідоме джерело TRC20 '{source}', доступні: {', '.join(TRC20_SOURCES)}")
+            continue
 
-            if len(transactions) < limit or any(datetime.fromtimestamp(tx["block_ts"] / 1000).date() < from_date for tx in transactions):
-                break
+        try:
+            transactions = fetch(address, from_dt, to_dt, api_key=item.get("api_key"), strict=True)
+            store_batches(ledger, "trc20", transactions, lambda batch: build_trc20_rows(batch, address))
+        except Exception as e:
+            print(f"❌ TRC20 перекази не отримано повністю, курсор не зсуваємо: {e}")
+            continue
 
-            start += limit
-            time.sleep(0.4)
-
-        existing_rows = worksheet.get_all_values()
-        header_offset = 1
-        existing_tx_by_hash = {}
-        for i, row in enumerate(existing_rows[header_offset:], start=header_offset + 1):
-            full_row = row + [""] * (25 - len(row))
-            tx_hash = full_row[16]
-            if tx_hash:
-                existing_tx_by_hash[tx_hash] = {"row_number": i, "row_data": full_row}
-
-        rows_to_update = []
-        rows_to_append = []
-
-        address_lower = address.lower()
-        for tx in all_transactions:
-            ts = int(tx["block_ts"] / 1000)
-            serial_date = timestamp_to_serial_date(ts)
-            token = tx.get("token_info", {}).get("symbol", "")
-            method = "TRC20"
-            to_address = tx.get("to_address", "")
-            from_address = tx.get("from_address", "")
-            tx_hash = tx.get("transaction_id", "")
-
-            try:
-                amount = float(tx.get("quant", 0)) / 10 ** int(tx.get("token_info", {}).get("decimals", 6))
-            except Exception:
-                amount = 0
-
-            fee = 0
-            type_operation = "debit" if to_address.lower() == address_lower.lower() else "credit"
-            address_counterparty = to_address if type_operation == "credit" else from_address
-
-            new_row = [""] * 25
-            new_row[0] = serial_date
-            new_row[1] = method
-            new_row[3] = address
-            new_row[4] = type_operation
-            new_row[5] = abs(format_amount(amount))
-            new_row[6] = abs(format_amount(amount))
-            new_row[7] = token or "USDT"
-            new_row[8] = "" if abs(fee) == 0 else abs(fee)
-            new_row[13] = address_counterparty
-            new_row[16] = tx_hash
-
-            if tx_hash in existing_tx_by_hash:
-                existing = existing_tx_by_hash[tx_hash]
-                if new_row != existing["row_data"]:
-                    rows_to_update.append((existing["row_number"], new_row))
-            else:
-                rows_to_append.append(new_row)
-
-        if rows_to_update:
-            batch_data = [{"range": f"A{row_number}:Y{row_number}", "values": [row_data]} for row_number, row_data in rows_to_update]
-            worksheet.batch_update(batch_data)
-            print(f"🔁 Оновлено {len(rows_to_update)} транзакцій.")
-
-        if rows_to_append:
-            start_row = len(existing_rows) + 1
-            needed_rows = start_row + len(rows_to_append)
-            current_max_rows = worksheet.row_count
-
-            if needed_rows > current_max_rows:
-                worksheet.add_rows(needed_rows - current_max_rows)
-
-            worksheet.update(f"A{start_row}:Y{start_row + len(rows_to_append) - 1}", rows_to_append)
-            print(f"➕ Додано {len(rows_to_append)} нових транзакцій з рядка {start_row}.")
-        else:
-            print("✅ Нових транзакцій для додавання немає.")
+        save_cursor("trc20", address.lower(), to_dt)
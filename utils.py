@@ -1,5 +1,16 @@
-import requests
+import os
+import json
+import time
+import threading
 from datetime import datetime
+from http_client import http_get
+
+EXCHANGE_RATES_FILE = "exchange_rates.json"
+EXCHANGE_RATES_TTL = 3600
+
+_rates_lock = threading.Lock()
+_rates_index = None
+_rates_fetched_at = 0
 
 def datetime_to_serial_float(dt: datetime) -> float:
     epoch = datetime(1899, 12, 30)
@@ -13,7 +24,7 @@ def format_amount(value):
 
 def get_mono_exchange_rates():
     try:
-        response = requests.get("https://api.monobank.ua/bank/currency")
+        response = http_get("https://api.monobank.ua/bank/currency")
         if response.status_code == 200:
             return response.json()
         else:
@@ -24,18 +35,77 @@ def get_mono_exchange_rates():
         return []
 
 
-def convert_currency(amount, from_ccy, to_ccy):
-    if from_ccy == to_ccy:
-        return amount
-    for rate in get_mono_exchange_rates():
+def _build_rates_index(rates):
+    """(A, B) -> (курс, чи ділити) — той самий вибір курсу, що й лінійний пошук по списку."""
+    index = {}
+    for rate in rates:
         a = rate.get("currencyCodeA")
         b = rate.get("currencyCodeB")
         r = rate.get("rateSell") or rate.get("rateCross")
-        if a == from_ccy and b == to_ccy and r:
-            return round(amount * r, 2)
-        if b == from_ccy and a == to_ccy and r:
-            return round(amount / r, 2)
-    print(f"⚠️ Курс для {from_ccy}->{to_ccy} не знайдено")
-    return amount
+        if not r:
+            continue
+        index.setdefault((a, b), (r, False))
+        index.setdefault((b, a), (r, True))
+    return index
+
+
+def _load_rates_file():
+    if not os.path.exists(EXCHANGE_RATES_FILE):
+        return None
+    try:
+        with open(EXCHANGE_RATES_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
 
+def refresh_exchange_rates(force=False):
+    """
+    Оновлює кеш курсів не частіше ніж раз на EXCHANGE_RATES_TTL.
+    Курси зберігаються на диск, тож після перезапуску (і коли Mono повертає 429)
+    використовується останній збережений список.
+    """
+    global _rates_index, _rates_fetched_at
 
+    with _rates_lock:
+        now = time.time()
+        if not force and _rates_index is not None and now - _rates_fetched_at < EXCHANGE_RATES_TTL:
+            return
+
+        cached = _load_rates_file()
+        if not force and cached and now - cached.get("fetched_at", 0) < EXCHANGE_RATES_TTL:
+            _rates_index = _build_rates_index(cached.get("rates", []))
+            _rates_fetched_at = cached["fetched_at"]
+            return
+
+        rates = get_mono_exchange_rates()
+        if rates:
+            tmp_file = f"{EXCHANGE_RATES_FILE}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": now, "rates": rates}, f)
+            os.replace(tmp_file, EXCHANGE_RATES_FILE)
+            _rates_index = _build_rates_index(rates)
+            _rates_fetched_at = now
+        elif cached:
+            print("⚠️ Використовуємо збережені курси валют.")
+            _rates_index = _build_rates_index(cached.get("rates", []))
+            # Повторимо спробу не раніше ніж через TTL
+            _rates_fetched_at = now
+        elif _rates_index is None:
+            _rates_index = {}
+
+
+def get_exchange_rate(from_ccy, to_ccy):
+    refresh_exchange_rates()
+    return _rates_index.get((from_ccy, to_ccy))
+
+
+def convert_currency(amount, from_ccy, to_ccy):
+    if from_ccy == to_ccy:
+        return amount
+    rate = get_exchange_rate(from_ccy, to_ccy)
+    if rate:
+        r, inverse = rate
+        return round(amount / r, 2) if inverse else round(amount * r, 2)
+    print(f"⚠️ Курс для {from_ccy}->{to_ccy} не знайдено")
+    return amount